@@ -54,30 +54,14 @@ class Command(BaseCommand):
             try:
                 payload = build_home_payload_exact(profile=p, user_id=p.user_id, do_logs=False)
 
-                RecoHomeSnapshot.objects.update_or_create(
-                    profile_id=p.id,
-                    defaults={
-                        "algo_version": "home_v1",
-                        "payload": payload,
-                        "expires_at": expires_at,
-                        "last_error": "",
-                    }
-                )
+                RecoHomeSnapshot.upsert(p.id, "home_v1", payload, expires_at)
 
                 ms = (time.perf_counter() - t0) * 1000.0
                 self.stdout.write(f"OK profile={p.id} rows={len(payload.get('rows', []))} ms={ms:.1f}")
                 ok += 1
 
             except Exception as e:
-                RecoHomeSnapshot.objects.update_or_create(
-                    profile_id=p.id,
-                    defaults={
-                        "algo_version": "home_v1",
-                        "payload": {},
-                        "expires_at": now + timedelta(minutes=10),
-                        "last_error": str(e),
-                    }
-                )
+                RecoHomeSnapshot.upsert(p.id, "home_v1", {}, now + timedelta(minutes=10), last_error=str(e))
                 self.stderr.write(f"ERR profile={p.id}: {e}")
                 err += 1
 
@@ -32,6 +32,27 @@ def split_name_character(name: str, character: str):
     return n, c
 
 
+BULK_BATCH = 1000
+
+
+def flush_actors(pending, dry):
+    """
+    One SELECT for the (title, name_norm) pairs already stored, then one
+    multi-row INSERT for the rest. Returns (created, skipped_existing).
+    """
+    if not pending:
+        return 0, 0
+    existing = set(
+        Actor.objects.filter(title_id__in={a.title_id for a in pending})
+        .values_list("title_id", "name_norm")
+    )
+    fresh = [a for a in pending if (a.title_id, a.name_norm) not in existing]
+    if fresh and not dry:
+        # UniqueConstraint(title, name_norm) dedupes anything written concurrently.
+        Actor.objects.bulk_create(fresh, batch_size=BULK_BATCH, ignore_conflicts=True)
+    return len(fresh), len(pending) - len(fresh)
+
+
 class Command(BaseCommand):
     help = "Populate Actor table from Title.cast JSONField (top N, dedupe per title, progress logs)."
 
@@ -64,6 +85,7 @@ class Command(BaseCommand):
         skipped_bad_cast = 0
 
         processed = 0
+        pending = []
 
         for title in qs:
             processed += 1
@@ -105,21 +127,20 @@ class Command(BaseCommand):
                     continue
                 seen.add(name_norm)
 
-                exists = Actor.objects.filter(title_id=title.id, name_norm=name_norm).exists()
-                if exists:
-                    skipped_existing += 1
-                    continue
-
-                if not dry:
-                    Actor.objects.create(
-                        title_id=title.id,
-                        name=name,
-                        name_norm=name_norm,
-                        character=character,
-                        tmdb_id=tmdb_id,
-                        profile_path=profile_path,
-                    )
-                created += 1
+                pending.append(Actor(
+                    title_id=title.id,
+                    name=name,
+                    name_norm=name_norm,
+                    character=character,
+                    tmdb_id=tmdb_id,
+                    profile_path=profile_path,
+                ))
+
+            if len(pending) >= BULK_BATCH or processed == total_titles:
+                c, sk = flush_actors(pending, dry)
+                created += c
+                skipped_existing += sk
+                pending = []
 
             if processed % log_every == 0 or processed == total_titles:
                 elapsed = time.time() - t0
@@ -134,6 +155,10 @@ class Command(BaseCommand):
                     f"rate={rate:.1f} titles/s ETA={eta/60:.1f}m"
                 )
 
+        c, sk = flush_actors(pending, dry)
+        created += c
+        skipped_existing += sk
+
         elapsed = time.time() - t0
         self.stdout.write(self.style.SUCCESS(
             f"DONE populate_actors: titles={processed} created={created} "
@@ -1,5 +1,6 @@
 from datetime import timezone
-from django.db import models
+from django.core.cache import cache
+from django.db import connection, models
 from users.models import Title, Profile
 
 
@@ -115,6 +116,27 @@ class RecoHomeSnapshot(models.Model):
             models.Index(fields=["algo_version", "expires_at"]),
         ]
 
+    @staticmethod
+    def cache_key(profile_id):
+        # (etag, payload) servi par RecoHomeView; invalidé à chaque upsert
+        return f"reco:home:v1:{profile_id}"
+
+    @classmethod
+    def upsert(cls, profile_id, algo_version, payload, expires_at, last_error=""):
+        """
+        1 statement (INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE)
+        au lieu de update_or_create (SELECT FOR UPDATE puis INSERT/UPDATE).
+        """
+        cls.objects.bulk_create(
+            [cls(profile_id=profile_id, algo_version=algo_version, payload=payload,
+                 expires_at=expires_at, last_error=last_error)],
+            update_conflicts=True,
+            update_fields=["algo_version", "payload", "built_at", "expires_at", "last_error"],
+            # MySQL n'accepte pas de cible de conflit (toute clé unique: ici profile)
+            unique_fields=["profile"] if connection.features.supports_update_conflicts_with_target else None,
+        )
+        cache.delete(cls.cache_key(profile_id))
+
     def is_valid(self, now=None):
         now = now or timezone.now()
         return bool(self.payload) and self.expires_at and self.expires_at > now
\ No newline at end of file
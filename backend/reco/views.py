@@ -1,3 +1,4 @@
+import hashlib
 import math
 import pickle
 from datetime import datetime, timedelta
@@ -7,7 +8,9 @@ import time
 import logging
 import numpy as np
 
-from django.db.models import Count
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Value
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
@@ -271,6 +274,36 @@ def _cached_ids(key, builder_fn, ttl=GLOBAL_CANDS_TTL):
     return ids
 
 
+def _cached_popular_and_lang_ids(lang, limit=1200):
+    """
+    popular_seed + in_lang_seed:<lang> (mêmes clés que _cached_ids).
+    Si les deux sont froids: 1 seule requête UNION ALL au lieu de 2 scans séparés.
+    """
+    pop_ck, lang_ck = "reco:global:popular_seed", f"reco:global:in_lang_seed:{lang}"
+    got = cache.get_many([pop_ck, lang_ck])
+    pop_ids, lang_ids = got.get(pop_ck), got.get(lang_ck)
+    if pop_ids and lang_ids:
+        return pop_ids, lang_ids
+
+    base = Title.objects.order_by("-popularity", "-vote_average")
+    if pop_ids or lang_ids or not connection.features.supports_slicing_ordering_in_compound:
+        return (
+            _cached_ids("popular_seed", lambda: base.values_list("id", flat=True)[:limit]),
+            _cached_ids(f"in_lang_seed:{lang}",
+                        lambda: base.filter(original_language=lang).values_list("id", flat=True)[:limit]),
+        )
+
+    cols = ("pri", "id", "popularity", "vote_average")
+    pop_qs = base.annotate(pri=Value(0)).values_list(*cols)[:limit]
+    lang_qs = base.filter(original_language=lang).annotate(pri=Value(1)).values_list(*cols)[:limit]
+    pop_ids, lang_ids = [], []
+    for pri, tid, _, __ in pop_qs.union(lang_qs, all=True).order_by("pri", "-popularity", "-vote_average"):
+        (lang_ids if pri else pop_ids).append(tid)
+
+    cache.set_many({pop_ck: pop_ids, lang_ck: lang_ids}, GLOBAL_CANDS_TTL)
+    return pop_ids, lang_ids
+
+
 def _cached_trending_ids(hours=72):
     ck = f"reco:trend:{hours}h"
     ids = cache.get(ck)
@@ -308,15 +341,11 @@ def _rank_and_pick_ids(profile, prof_vec, rank_model, row_type, cand_ids, k,
 
     _t0 = time.perf_counter()
 
-    uniq_ids = []
-    seen_local = set()
-    for tid in cand_ids:
-        if tid in exclude_ids or tid in seen_local:
-            continue
-        if tid not in title_by_id:
-            continue
-        seen_local.add(tid)
-        uniq_ids.append(tid)
+    # dict.fromkeys: ordered dedupe in C (first occurrence wins), then the two filters
+    uniq_ids = [
+        tid for tid in dict.fromkeys(cand_ids)
+        if tid not in exclude_ids and tid in title_by_id
+    ]
 
     if len(uniq_ids) < 4:
         return [], set()
@@ -463,9 +492,8 @@ def build_home_payload_exact(profile, user_id=None, do_logs=True):
         new_movies_ids = _cached_ids(
             "new_movies",
             lambda: (
-                Title.objects.filter(type="movie")
-                .exclude(release_date="")
-                .order_by("-release_date")
+                Title.objects.filter(type="movie", release_date_d__isnull=False)
+                .order_by("-release_date_d")
                 .values_list("id", flat=True)[:1200]
             )
         )
@@ -591,21 +619,22 @@ def build_home_payload_exact(profile, user_id=None, do_logs=True):
 
         _plan_mark("studio_network_country", planned=len(planned_rows))
 
-        recent_titles_for_features = list(
-            Title.objects.filter(id__in=recent_action_ids[:120]).only("id", "cast", "keywords")
+        # raw (cast, keywords) pairs: no Title instances built just to read two JSON lists
+        recent_cast_keywords = list(
+            Title.objects.filter(id__in=recent_action_ids[:120]).values_list("cast", "keywords")
         )
 
         actors = Counter()
-        for t in recent_titles_for_features:
-            for name in (t.cast or [])[:5]:
+        for cast, _ in recent_cast_keywords:
+            for name in (cast or [])[:5]:
                 actors[str(name).lower()] += 1
         for actor, _ in actors.most_common(2):
             ids = _ids_from_table(Actor.objects.filter(name_norm=actor))
             planned_rows.append((f"actor:{actor}", f"Starring {actor.title()}", ids, 30))
 
         keywords = Counter()
-        for t in recent_titles_for_features:
-            for k in (t.keywords or [])[:5]:
+        for _, kws in recent_cast_keywords:
+            for k in (kws or [])[:5]:
                 keywords[str(k).lower()] += 1
         for kw, _ in keywords.most_common(2):
             ids = _ids_from_table(TitleKeyword.objects.filter(keyword_norm=kw))
@@ -629,9 +658,8 @@ def build_home_payload_exact(profile, user_id=None, do_logs=True):
         "fresh_movies",
         lambda: (
             Title.objects
-            .filter(type="movie", release_date__isnull=False)
-            .exclude(release_date="")
-            .order_by("-release_date")
+            .filter(type="movie", release_date_d__isnull=False)
+            .order_by("-release_date_d")
             .values_list("id", flat=True)[:900]
         )
     )
@@ -639,9 +667,8 @@ def build_home_payload_exact(profile, user_id=None, do_logs=True):
         "fresh_tv",
         lambda: (
             Title.objects
-            .filter(type="tv", first_air_date__isnull=False)
-            .exclude(first_air_date="")
-            .order_by("-first_air_date")
+            .filter(type="tv", first_air_date_d__isnull=False)
+            .order_by("-first_air_date_d")
             .values_list("id", flat=True)[:900]
         )
     )
@@ -738,13 +765,18 @@ def build_home_payload_exact(profile, user_id=None, do_logs=True):
 
 def build_seed_home_payload(profile):
     rows_plan = []
+    lang = getattr(profile, "language_preference", "") or ""
 
-    # 1) Popular
-    popular_ids = _cached_ids(
-        "popular_seed",
-        lambda: Title.objects.order_by("-popularity", "-vote_average")
-            .values_list("id", flat=True)[:1200]
-    )
+    # 1) Popular (+ langue dans la même requête)
+    in_lang_ids = []
+    if lang:
+        popular_ids, in_lang_ids = _cached_popular_and_lang_ids(lang)
+    else:
+        popular_ids = _cached_ids(
+            "popular_seed",
+            lambda: Title.objects.order_by("-popularity", "-vote_average")
+                .values_list("id", flat=True)[:1200]
+        )
     rows_plan.append(("popular", "Popular right now", list(popular_ids)[:30]))
 
     # 2) Top rated
@@ -760,14 +792,7 @@ def build_seed_home_payload(profile):
     rows_plan.append(("trending", "Trending", trend_ids[:30]))
 
     # 4) Language row (si dispo)
-    lang = getattr(profile, "language_preference", "") or ""
     if lang:
-        in_lang_ids = _cached_ids(
-            f"in_lang_seed:{lang}",
-            lambda: Title.objects.filter(original_language=lang)
-                .order_by("-popularity", "-vote_average")
-                .values_list("id", flat=True)[:1200]
-        )
         rows_plan.insert(1, ("in_lang", f"In {lang.upper()}", list(in_lang_ids)[:30]))
 
     # Fetch display fields en 1 query
@@ -795,15 +820,7 @@ def build_seed_home_payload(profile):
 def upsert_seed_snapshot(profile, hours=6):
     payload = build_seed_home_payload(profile)
     now = timezone.now()
-    RecoHomeSnapshot.objects.update_or_create(
-        profile_id=profile.id,
-        defaults={
-            "algo_version": "home_v1_seed",
-            "payload": payload,
-            "expires_at": now + timedelta(hours=hours),
-            "last_error": "",
-        }
-    )
+    RecoHomeSnapshot.upsert(profile.id, "home_v1_seed", payload, now + timedelta(hours=hours))
     return payload
 
 
@@ -811,6 +828,12 @@ def upsert_seed_snapshot(profile, hours=6):
 # RECO: HOME
 # ============================================================
 
+def _etag_matches(etag, if_none_match):
+    """If-None-Match: liste d'ETags séparés par des virgules (W/ faible accepté) ou '*'."""
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
 # dans reco/views.py (RecoHomeView.get)
 class RecoHomeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -819,34 +842,49 @@ class RecoHomeView(APIView):
         profile_id = request.query_params.get("profileId")
         profile = get_object_or_404(Profile, id=profile_id, user=request.user)
 
-        # 1) Snapshot principal (cron)
+        # Le cron build_home_snapshots invalide via RecoHomeSnapshot.upsert -> cache.delete:
+        # ça n'atteint les workers web que si le cache est partagé (Redis). En LocMem, on relit
+        # la ligne à chaque requête plutôt que de servir un home périmé pendant HOME_CACHE_TTL.
+        ck = RecoHomeSnapshot.cache_key(profile.id)
+        hit = cache.get(ck) if settings.SHARED_CACHE else None
+        if hit is None:
+            hit = self._load(profile.id)
+            if hit is not None and settings.SHARED_CACHE:
+                cache.set(ck, hit, HOME_CACHE_TTL)
+        if hit is None:
+            # 3) seed global partagé (cache), au lieu d'une copie par profil
+            from users.signals import build_global_seed_payload
+            payload = build_global_seed_payload()
+            ids = ",".join(map(str, payload["rows"][0]["title_ids"]))
+            hit = ('"seed-%s"' % hashlib.sha1(ids.encode()).hexdigest()[:16], payload)
+
+        etag, payload = hit
+        if _etag_matches(etag, request.headers.get("If-None-Match", "")):
+            return Response(status=304, headers={"ETag": etag})
+        return Response(payload, headers={"ETag": etag})
+
+    @staticmethod
+    def _load(profile_id):
+        """(etag, payload) du snapshot du profil (1 ligne: profile est OneToOne), ou None."""
         snap = (
             RecoHomeSnapshot.objects
-            .filter(profile_id=profile.id, algo_version="home_v1")
-            .only("payload", "built_at", "expires_at")
-            .order_by("-built_at")
+            .filter(profile_id=profile_id)
+            .only("algo_version", "payload", "built_at")
             .first()
         )
-        if snap and snap.payload and snap.payload.get("rows") is not None:
-            payload = snap.payload
-            payload.setdefault("mode", "snapshot")
-            return Response(payload)
-
-        # 2) Snapshot seed (créé au moment de la création du profile)
-        seed = (
-            RecoHomeSnapshot.objects
-            .filter(profile_id=profile.id, algo_version="home_v1_seed")
-            .only("payload", "built_at")
-            .order_by("-built_at")
-            .first()
-        )
-        if seed and seed.payload and seed.payload.get("rows") is not None:
-            payload = seed.payload
-            payload.setdefault("mode", "seed_snapshot")
-            return Response(payload)
-
-        # 3) ultime fallback (ne devrait plus arriver)
-        return Response({"mode": "no_snapshot_yet", "rows": []})
+        if not snap or not snap.payload or snap.payload.get("rows") is None:
+            return None
+        if snap.algo_version == "home_v1":
+            # 1) Snapshot principal (cron)
+            mode = "snapshot"
+        elif snap.algo_version == "home_v1_seed":
+            # 2) Snapshot seed (créé au moment de la création du profile)
+            mode = "seed_snapshot"
+        else:
+            return None
+        payload = snap.payload
+        payload.setdefault("mode", mode)
+        return f'"{profile_id}-{snap.built_at.timestamp():.6f}"', payload
 
 
 # ============================================================
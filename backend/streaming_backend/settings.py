@@ -92,16 +92,30 @@ DATABASES = {
         "PASSWORD": env("DB_PASSWORD", default=""),
         "HOST": env("DB_HOST", default="localhost"),
         "PORT": env("DB_PORT", default="3306"),
+        # connexions persistantes (évite un handshake TCP+auth par requête / par thread)
+        "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", default=600),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# ---- Cache ----
+# REDIS_URL: cache partagé entre les workers gunicorn et les commandes cron, donc une
+# invalidation (cache.delete) est vue par tous. Sans lui: LocMem par process, et les caches
+# qui dépendent d'une invalidation venant d'un autre process se désactivent (SHARED_CACHE).
+REDIS_URL = env("REDIS_URL", default="")
+SHARED_CACHE = bool(REDIS_URL)
+if SHARED_CACHE:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 # ---- Auth ----
 AUTH_USER_MODEL = "users.User"
 
 # ---- REST / JWT ----
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "users.pagination.StandardResultsSetPagination",
 }
@@ -0,0 +1,42 @@
+# users/authentication.py
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Invalidé par users.signals à chaque save/delete de User (cache partagé requis, cf. SHARED_CACHE).
+JWT_USER_TTL = 60
+
+
+def jwt_user_cache_key(user_id):
+    return f"jwt:user:v1:{user_id}"
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication sans SELECT user à chaque requête: l'utilisateur actif est gardé en cache."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        # LocMem = un cache par worker: une désactivation ne serait pas vue ailleurs, donc pas de cache
+        if user_id is None or not settings.SHARED_CACHE:
+            return super().get_user(validated_token)
+
+        key = jwt_user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            # lève AuthenticationFailed si absent / inactif: seuls les succès sont mis en cache
+            user = super().get_user(validated_token)
+            cache.set(key, user, JWT_USER_TTL)
+            return user
+
+        # mêmes contrôles que JWTAuthentication.get_user, rejoués sur l'objet en cache
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
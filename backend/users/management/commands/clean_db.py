@@ -1,14 +1,17 @@
 # users/management/commands/clean_db.py
 import os
+import json
 import time
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, List
 
 import requests
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from django.db.models import Count, Min, Q
+from django.db.models import Count, Max, Min, Q
 
 from users.models import Title, TVShowExtras, Season, Episode, Actor
 
@@ -120,6 +123,83 @@ class TMDbClient:
         return r.json()
 
 
+class TokenBucket:
+    """
+    Thread-safe rate limiter shared by all TMDb worker threads.
+    Defaults match TMDb's ~40 requests / 10 seconds cap.
+    """
+    def __init__(self, capacity: int = 40, refill: float = 40 / 10.0):
+        self.capacity = float(capacity)
+        self.refill = float(refill)  # tokens per second
+        self._tokens = float(capacity)
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.refill)
+                self._ts = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.refill
+            time.sleep(wait)
+
+
+class TMDbDiskCache:
+    """
+    Persistent cache for TMDb payloads: one JSON file per key, expiry read from file mtime.
+    Safe to share between worker threads (atomic replace on write).
+    """
+    VERSION = "v1"
+
+    def __init__(self, path: str, ttl_s: float):
+        self.path = path
+        self.ttl_s = ttl_s  # 0 = never expires
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.{self.VERSION}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        fp = self._file(key)
+        try:
+            if self.ttl_s and (time.time() - os.path.getmtime(fp)) > self.ttl_s:
+                return None
+            with open(fp, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: dict):
+        fp = self._file(key)
+        tmp = f"{fp}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, fp)
+
+
+def cached_get(tmdb: TMDbClient, cache: Optional[TMDbDiskCache], key: str, path: str,
+               params: Optional[dict], bucket: TokenBucket) -> dict:
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    bucket.acquire()
+    data = tmdb.get(path, params=params)
+    if cache is not None:
+        cache.set(key, data)
+    return data
+
+
+def _fetch_season(tmdb: TMDbClient, tv_tmdb_id: int, snum: int, bucket: TokenBucket,
+                  cache: Optional[TMDbDiskCache] = None) -> dict:
+    return cached_get(tmdb, cache, f"season_{int(tv_tmdb_id)}_{snum}",
+                      f"/tv/{int(tv_tmdb_id)}/season/{snum}", {}, bucket)
+
+
 def tmdb_trailer_url(full: dict) -> str:
     for v in (full.get("videos") or {}).get("results", []) or []:
         if v.get("site") == "YouTube" and v.get("type") == "Trailer":
@@ -188,7 +268,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--dry-run", action="store_true", help="No DB writes (prints what would happen).")
         parser.add_argument("--overwrite", action="store_true", help="Overwrite non-empty fields (default: fill only if empty).")
-        parser.add_argument("--sleep", type=float, default=0.15, help="Delay between TMDb calls.")
+        parser.add_argument("--sleep", type=float, default=0.15, help="Delay between TMDb calls (--backfill-tmdb; --tv-fix-missing-episodes is paced by its token bucket).")
         parser.add_argument("--limit", type=int, default=0, help="Limit titles processed in TMDb backfill (0=all).")
 
         parser.add_argument("--dedupe", action="store_true", help="Remove duplicates on (type,tmdb_id).")
@@ -199,6 +279,10 @@ class Command(BaseCommand):
         parser.add_argument("--tv-fix-missing-episodes", action="store_true", help="Scan TV titles and ONLY sync seasons/episodes for shows missing episodes (or incomplete vs TVShowExtras.number_of_episodes).")
         parser.add_argument("--tv-max-seasons", type=int, default=2)
         parser.add_argument("--skip-specials", action="store_true")
+        parser.add_argument("--tv-workers", type=int, default=8, help="Concurrent TMDb season fetches for --tv-fix-missing-episodes (rate-limited to ~40 req/10s).")
+        parser.add_argument("--tmdb-cache-dir", type=str, default=".tmdb_cache", help="Disk cache for TMDb show/season payloads used by --tv-fix-missing-episodes.")
+        parser.add_argument("--tmdb-cache-ttl", type=float, default=7, help="Days before a cached TMDb payload is refetched (0 = never).")
+        parser.add_argument("--no-tmdb-cache", action="store_true", help="Bypass the TMDb disk cache.")
 
         # LOGGING OPTIONS
         parser.add_argument("--verbose", action="store_true", help="More logs.")
@@ -208,8 +292,26 @@ class Command(BaseCommand):
         parser.add_argument("--max-log", type=int, default=200, help="Max detailed logs printed for changes/skips.")
         parser.add_argument("--check-dups", action="store_true", help="Print remaining duplicate groups at end.")
 
+    # Log lines are batched into one write (every LOG_BUFFER_LINES lines or LOG_FLUSH_S seconds)
+    # instead of one write per line; --log-changes/--log-skips can emit thousands per minute.
+    LOG_BUFFER_LINES = 64
+    LOG_FLUSH_S = 1.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._log_buf: List[str] = []
+        self._log_flushed = 0.0
+
     def log(self, msg: str):
-        self.stdout.write(msg)
+        self._log_buf.append(msg)
+        if len(self._log_buf) >= self.LOG_BUFFER_LINES or (time.monotonic() - self._log_flushed) >= self.LOG_FLUSH_S:
+            self.flush_log()
+
+    def flush_log(self):
+        if self._log_buf:
+            self.stdout.write("\n".join(self._log_buf))
+            self._log_buf.clear()
+        self._log_flushed = time.monotonic()
 
     def maybe_sleep(self, sec: float):
         if sec and sec > 0:
@@ -584,17 +686,21 @@ class Command(BaseCommand):
         self,
         dry_run: bool,
         overwrite: bool,
-        sleep_s: float,
         tv_max_seasons: int,
         skip_specials: bool,
         verbose: bool,
         progress_every: int,
         max_log: int,
+        workers: int = 8,
+        cache: Optional[TMDbDiskCache] = None,
     ) -> Dict[str, int]:
         """
         Find TV Titles that have missing episodes and sync Season/Episode rows from TMDb.
         - If TVShowExtras.number_of_episodes is known, we consider it "complete" when episode_count >= number_of_episodes.
         - Otherwise, we consider it "missing" when episode_count == 0.
+        Season payloads are fetched concurrently (``workers`` threads) behind a shared TokenBucket;
+        all DB writes stay on the main thread. With ``cache`` set, show/season payloads are
+        served from disk when fresh and TMDb is not called.
         """
         stats = {
             "tv_titles_scanned": 0,
@@ -607,135 +713,166 @@ class Command(BaseCommand):
         }
 
         tmdb = TMDbClient()
+        bucket = TokenBucket()
         qs = Title.objects.filter(type="tv").exclude(tmdb_id__isnull=True).order_by("id")
         total = qs.count()
-        self.log(f"[tv-fix-missing] START total_tv={total} tv_max_seasons={tv_max_seasons} skip_specials={skip_specials}")
+        # current state for every show in the same query (no per-title COUNT/EXISTS round trips)
+        qs = qs.only("id", "tmdb_id", "type").annotate(
+            ep_cnt=Count("seasons__episodes"),
+            null_tmdb_cnt=Count("seasons__episodes", filter=Q(seasons__episodes__tmdb_id__isnull=True)),
+            expected_eps=Max("tv_extras__number_of_episodes"),
+        )
+        self.log(f"[tv-fix-missing] START total_tv={total} tv_max_seasons={tv_max_seasons} skip_specials={skip_specials} workers={workers}")
 
         printed = 0
-        for idx, t in enumerate(qs, start=1):
-            stats["tv_titles_scanned"] += 1
-            try:
-                # current state
-                current_eps = Episode.objects.filter(season__tv=t).count()
-                extras = TVShowExtras.objects.filter(title=t).first()
-                expected_eps = int(getattr(extras, "number_of_episodes", 0) or 0)
-
-                missing = (expected_eps > 0 and current_eps < expected_eps) or (expected_eps == 0 and current_eps == 0)
-                null_tmdb = Episode.objects.filter(season__tv=t, tmdb_id__isnull=True).exists()
-                missing = missing or null_tmdb
-                if missing and null_tmdb and verbose:
-                    self.log(f"[tv-fix-missing] title_id={t.id} tmdb={t.tmdb_id} has episodes with NULL tmdb_id; will resync")
-                if not missing:
-                    stats["tv_titles_skipped"] += 1
-                    continue
-
-                full = tmdb.get(f"/tv/{int(t.tmdb_id)}", params={"append_to_response": "credits,keywords"})
-                if not dry_run:
-                    TVShowExtras.objects.update_or_create(
-                        title=t,
-                        defaults={
-                            "number_of_seasons": safe_int(full.get("number_of_seasons"), 0) or 0,
-                            "number_of_episodes": safe_int(full.get("number_of_episodes"), 0) or 0,
-                            "in_production": bool(full.get("in_production")),
-                            "episode_run_time": full.get("episode_run_time") or [],
-                            "network_names": [n.get("name") for n in (full.get("networks") or []) if n.get("name")],
-                        },
-                    )
-                stats["tv_extras_upserted"] += 1
-
-                seasons = full.get("seasons") or []
-                for s in seasons:
-                    snum = safe_int(s.get("season_number"))
-                    if snum is None:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for idx, t in enumerate(qs, start=1):
+                stats["tv_titles_scanned"] += 1
+                try:
+                    # current state
+                    current_eps = int(t.ep_cnt or 0)
+                    expected_eps = int(t.expected_eps or 0)
+
+                    missing = (expected_eps > 0 and current_eps < expected_eps) or (expected_eps == 0 and current_eps == 0)
+                    null_tmdb = bool(t.null_tmdb_cnt)
+                    missing = missing or null_tmdb
+                    if missing and null_tmdb and verbose:
+                        self.log(f"[tv-fix-missing] title_id={t.id} tmdb={t.tmdb_id} has episodes with NULL tmdb_id; will resync")
+                    if not missing:
+                        stats["tv_titles_skipped"] += 1
                         continue
-                    if skip_specials and snum == 0:
-                        continue
-                    if tv_max_seasons and snum > tv_max_seasons:
-                        continue
-
-                    defaults_s = {
-                        "tmdb_id": safe_int(s.get("id")),
-                        "name": s.get("name") or "",
-                        "overview": s.get("overview") or "",
-                        "air_date": s.get("air_date") or "",
-                        "poster": s.get("poster_path") or "",
-                    }
 
-                    if dry_run:
-                        season_obj = Season(tv=t, season_number=snum, **defaults_s)
-                        created_season = True
-                    else:
-                        season_obj, created_season = Season.objects.update_or_create(
-                            tv=t,
-                            season_number=snum,
-                            defaults=defaults_s,
+                    full = cached_get(tmdb, cache, f"tv_{int(t.tmdb_id)}", f"/tv/{int(t.tmdb_id)}",
+                                      {"append_to_response": "credits,keywords"}, bucket)
+                    if not dry_run:
+                        TVShowExtras.objects.update_or_create(
+                            title=t,
+                            defaults={
+                                "number_of_seasons": safe_int(full.get("number_of_seasons"), 0) or 0,
+                                "number_of_episodes": safe_int(full.get("number_of_episodes"), 0) or 0,
+                                "in_production": bool(full.get("in_production")),
+                                "episode_run_time": full.get("episode_run_time") or [],
+                                "network_names": [n.get("name") for n in (full.get("networks") or []) if n.get("name")],
+                            },
                         )
-                    stats["seasons_upserted"] += 1
-
-                    # now episodes for that season
-                    sfull = tmdb.get(f"/tv/{int(t.tmdb_id)}/season/{snum}", params={})
-                    eps = sfull.get("episodes") or []
-
-                    if verbose and printed < max_log:
-                        self.log(f"[tv-fix-missing] tv_id={t.id} tmdb={t.tmdb_id} season={snum} episodes={len(eps)}")
-                        printed += 1
-
-                    for e in eps:
-                        enum = safe_int(e.get("episode_number"), 0) or 0
-                        links = episode_links(int(t.tmdb_id), snum, enum)
-                        defaults_e = {
-                            "tmdb_id": safe_int(e.get("id")),
-                            "name": e.get("name") or "",
-                            "overview": e.get("overview") or "",
-                            "air_date": e.get("air_date") or "",
-                            "still_path": e.get("still_path") or "",
-                            "vote_average": e.get("vote_average"),
-                            "vote_count": e.get("vote_count"),
-                            "runtime": e.get("runtime"),
-                            "imdb_code": None,
-                            "video_url": links["video_url"],
-                            "episode_link2": links["episode_link2"],
-                            "episode_link3": links["episode_link3"],
-                            "episode_link4": links["episode_link4"],
-                            "episode_link5": links["episode_link5"],
-                            "episode_link6": links["episode_link6"],
+                    stats["tv_extras_upserted"] += 1
+
+                    wanted = []
+                    for s in (full.get("seasons") or []):
+                        snum = safe_int(s.get("season_number"))
+                        if snum is None:
+                            continue
+                        if skip_specials and snum == 0:
+                            continue
+                        if tv_max_seasons and snum > tv_max_seasons:
+                            continue
+                        wanted.append((s, snum))
+
+                    # Shows synced only up to --tv-max-seasons never reach number_of_episodes:
+                    # compare against the seasons in scope before fetching any season payload.
+                    expected_in_scope = sum(safe_int(s.get("episode_count"), 0) or 0 for s, _ in wanted)
+                    if not null_tmdb and expected_in_scope and current_eps >= expected_in_scope:
+                        stats["tv_titles_skipped"] += 1
+                        continue
+
+                    season_jobs = []
+                    for s, snum in wanted:
+                        defaults_s = {
+                            "tmdb_id": safe_int(s.get("id")),
+                            "name": s.get("name") or "",
+                            "overview": s.get("overview") or "",
+                            "air_date": s.get("air_date") or "",
+                            "poster": s.get("poster_path") or "",
                         }
 
                         if dry_run:
-                            stats["episodes_upserted"] += 1
-                            continue
+                            season_obj = Season(tv=t, season_number=snum, **defaults_s)
+                            created_season = True
+                        else:
+                            season_obj, created_season = Season.objects.update_or_create(
+                                tv=t,
+                                season_number=snum,
+                                defaults=defaults_s,
+                            )
+                        stats["seasons_upserted"] += 1
+                        season_jobs.append((season_obj, snum))
 
-                        ep_obj, created = Episode.objects.update_or_create(
-                            season=season_obj,
-                            episode_number=enum,
-                            defaults=defaults_e,
-                        )
-                        # If overwrite=False, we still want to preserve existing non-empty fields;
-                        # update_or_create already set defaults (overwrites). So we re-apply fill-only logic when overwrite is False.
-                        if not overwrite:
-                            ep_changed = False
-                            for f, v in defaults_e.items():
-                                if hasattr(ep_obj, f) and fill_field(ep_obj, f, v, overwrite=False):
-                                    ep_changed = True
-                            if ep_changed and not created:
-                                ep_obj.save()
+                    # now episodes: fetch every season of this show concurrently
+                    futures = {
+                        pool.submit(_fetch_season, tmdb, int(t.tmdb_id), snum, bucket, cache): (season_obj, snum)
+                        for season_obj, snum in season_jobs
+                    }
+                    for fut in as_completed(futures):
+                        season_obj, snum = futures[fut]
+                        sfull = fut.result()
+                        eps = sfull.get("episodes") or []
+
+                        if verbose and printed < max_log:
+                            self.log(f"[tv-fix-missing] tv_id={t.id} tmdb={t.tmdb_id} season={snum} episodes={len(eps)}")
+                            printed += 1
+
+                        # one SELECT for the season, then diff in memory: each episode hits the DB at most once
+                        existing = {} if dry_run else {ep.episode_number: ep for ep in Episode.objects.filter(season=season_obj)}
+                        to_create: List[Episode] = []
+                        to_update: Dict[int, Episode] = {}
+
+                        for e in eps:
+                            enum = safe_int(e.get("episode_number"), 0) or 0
+                            links = episode_links(int(t.tmdb_id), snum, enum)
+                            defaults_e = {
+                                "tmdb_id": safe_int(e.get("id")),
+                                "name": e.get("name") or "",
+                                "overview": e.get("overview") or "",
+                                "air_date": e.get("air_date") or "",
+                                "still_path": e.get("still_path") or "",
+                                "vote_average": e.get("vote_average"),
+                                "vote_count": e.get("vote_count"),
+                                "runtime": e.get("runtime"),
+                                "imdb_code": None,
+                                "video_url": links["video_url"],
+                                "episode_link2": links["episode_link2"],
+                                "episode_link3": links["episode_link3"],
+                                "episode_link4": links["episode_link4"],
+                                "episode_link5": links["episode_link5"],
+                                "episode_link6": links["episode_link6"],
+                            }
+
+                            if dry_run:
+                                stats["episodes_upserted"] += 1
+                                continue
 
-                        stats["episodes_upserted"] += 1
+                            ep_obj = existing.get(enum)
+                            if ep_obj is None:
+                                ep_obj = Episode(season=season_obj, episode_number=enum, **defaults_e)
+                                existing[enum] = ep_obj
+                                to_create.append(ep_obj)
+                            else:
+                                # If overwrite=False, preserve existing non-empty fields (fill-only).
+                                dirty = False
+                                for f, v in defaults_e.items():
+                                    if fill_field(ep_obj, f, v, overwrite=overwrite):
+                                        dirty = True
+                                if dirty and ep_obj.pk:
+                                    to_update[ep_obj.pk] = ep_obj
 
-                stats["tv_titles_fixed"] += 1
+                            stats["episodes_upserted"] += 1
 
-            except Exception as ex:
-                stats["tv_titles_errors"] += 1
-                if printed < max_log:
-                    self.log(f"[tv-fix-missing][ERROR] title_id={t.id} tmdb={t.tmdb_id} err={ex}")
+                        if to_create:
+                            Episode.objects.bulk_create(to_create, batch_size=500)
+                        if to_update:
+                            Episode.objects.bulk_update(list(to_update.values()), fields=list(defaults_e.keys()), batch_size=500)
 
-            if progress_every and (idx % progress_every == 0):
-                self.log(
-                    f"[tv-fix-missing] progress {idx}/{total} fixed={stats['tv_titles_fixed']} skipped={stats['tv_titles_skipped']} errors={stats['tv_titles_errors']}"
-                )
+                    stats["tv_titles_fixed"] += 1
+
+                except Exception as ex:
+                    stats["tv_titles_errors"] += 1
+                    if printed < max_log:
+                        self.log(f"[tv-fix-missing][ERROR] title_id={t.id} tmdb={t.tmdb_id} err={ex}")
 
-            if sleep_s:
-                self.maybe_sleep(sleep_s)
+                if progress_every and (idx % progress_every == 0):
+                    self.log(
+                        f"[tv-fix-missing] progress {idx}/{total} fixed={stats['tv_titles_fixed']} skipped={stats['tv_titles_skipped']} errors={stats['tv_titles_errors']}"
+                    )
 
         self.log(
             f"[tv-fix-missing] DONE scanned={stats['tv_titles_scanned']} fixed={stats['tv_titles_fixed']} "
@@ -761,6 +898,12 @@ class Command(BaseCommand):
             self.log(f"  - type={row['type']} tmdb_id={row['tmdb_id']} count={row['c']}")
 
     def handle(self, *args, **opts):
+        try:
+            self._handle(**opts)
+        finally:
+            self.flush_log()
+
+    def _handle(self, **opts):
         dry_run = bool(opts["dry_run"])
         overwrite = bool(opts["overwrite"])
         sleep_s = float(opts["sleep"])
@@ -774,6 +917,10 @@ class Command(BaseCommand):
         do_tv_fix_missing = bool(opts.get("tv_fix_missing_episodes"))
         tv_max_seasons = int(opts["tv_max_seasons"])
         skip_specials = bool(opts["skip_specials"])
+        tv_workers = int(opts["tv_workers"])
+        tmdb_cache = None
+        if do_tv_fix_missing and not opts["no_tmdb_cache"]:
+            tmdb_cache = TMDbDiskCache(opts["tmdb_cache_dir"], ttl_s=float(opts["tmdb_cache_ttl"]) * 86400)
 
         verbose = bool(opts["verbose"])
         log_changes = bool(opts["log_changes"])
@@ -833,12 +980,13 @@ class Command(BaseCommand):
             self.fix_missing_tv_episodes(
                 dry_run=dry_run,
                 overwrite=overwrite,
-                sleep_s=sleep_s,
                 tv_max_seasons=tv_max_seasons,
                 skip_specials=skip_specials,
                 verbose=verbose,
                 progress_every=progress_every,
                 max_log=max_log,
+                workers=tv_workers,
+                cache=tmdb_cache,
             )
 
         if check_dups:
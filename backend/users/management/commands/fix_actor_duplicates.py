@@ -1,28 +1,36 @@
+import functools
 import re
 import time
 import unicodedata
+from collections import defaultdict
 from dataclasses import dataclass
 
 from django.core.management.base import BaseCommand
-from django.db import transaction, IntegrityError
+from django.db import connection, reset_queries, transaction
 
 from users.models import Title, Actor
 
 
+@functools.lru_cache(maxsize=200_000)
 def norm(s: str) -> str:
     return " ".join((s or "").strip().lower().split())
 
 
 _AS_SPLIT_RE = re.compile(r"\s+as\s+", re.IGNORECASE)
 _TRAILING_PARENS_RE = re.compile(r"\(([^)]+)\)\s*$")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
 
 
+# Actor names repeat heavily across titles, so memoize.
+@functools.lru_cache(maxsize=200_000)
 def fold_key(s: str) -> str:
-    raw = unicodedata.normalize("NFKD", s or "")
-    no_marks = "".join(ch for ch in raw if not unicodedata.combining(ch))
-    lowered = no_marks.lower()
-    lowered = re.sub(r"[^a-z0-9]+", " ", lowered)
-    return " ".join(lowered.split())
+    s = s or ""
+    # Most names are plain ASCII: NFKD + combining-mark filtering is a no-op for them.
+    if not s.isascii():
+        raw = unicodedata.normalize("NFKD", s)
+        s = "".join(ch for ch in raw if not unicodedata.combining(ch))
+    # The regex already collapses every non-alnum run (whitespace included) to one space.
+    return _NON_ALNUM_RE.sub(" ", s.lower()).strip()
 
 
 def split_name_character(name: str, character: str):
@@ -53,37 +61,141 @@ class ActorItem:
     canonical_norm: str
 
 
+def chunked(iterable, size: int):
+    buf = []
+    for x in iterable:
+        buf.append(x)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+_ID_SPACE = (1 << 59) - 1
+
+
 def pick_keep(items):
+    # Same priority as (has tmdb_id, has photo, has character, name already clean, lowest id),
+    # bit-packed into one int so max() compares ints instead of tuples.
     def score(it: ActorItem):
         a = it.actor
         return (
-            1 if a.tmdb_id else 0,
-            1 if a.profile_path else 0,
-            1 if (a.character or it.parsed_character) else 0,
-            1 if a.name == it.parsed_name else 0,
-            -a.id,
+            ((1 if a.tmdb_id else 0) << 62)
+            | ((1 if a.profile_path else 0) << 61)
+            | ((1 if (a.character or it.parsed_character) else 0) << 60)
+            | ((1 if a.name == it.parsed_name else 0) << 59)
+            | (_ID_SPACE - a.id)
         )
     return max(items, key=score)
 
 
 class Command(BaseCommand):
+    """
+    Runs one short transaction per title chunk (no command-wide transaction) and
+    streams title ids, so memory stays flat on large libraries. Run with DEBUG=False:
+    with DEBUG on Django keeps every executed query in memory (reset per chunk here).
+    """
     help = "Normalize Actor names (strip character in name) and merge duplicates per title."
 
     def add_arguments(self, parser):
         parser.add_argument("--limit", type=int, default=0, help="Max titles to process (0 = all)")
         parser.add_argument("--log-every", type=int, default=500, help="Log every N titles processed")
         parser.add_argument("--dry-run", action="store_true", help="Don't write, only log counts")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Titles whose actors are loaded per query")
+        parser.add_argument("--no-progress", action="store_true", help="Skip the up-front title COUNT (no totals/ETA in logs)")
+        parser.add_argument(
+            "--mode",
+            choices=["python", "sql"],
+            default="python",
+            help="python = full merge (parses 'Name (Character)' / 'Name as Character'); "
+                 "sql = set-based dedupe of accent/case/punctuation variants of name_norm (MySQL 8)",
+        )
+
+    def handle_sql(self, dry: bool):
+        """
+        Set-based variant of the merge: rank actors per (title, folded name_norm) with
+        ROW_NUMBER() using the same priority as pick_keep, copy missing tmdb_id /
+        profile_path / character from the losers into the keeper, then delete the losers.
+        The fold is the stored Actor.name_fold column (lowercase, non-alnum -> space, computed by
+        the DB on write and indexed with title) compared under an accent-insensitive collation;
+        name/character re-parsing still needs --mode=python.
+        """
+        qn = connection.ops.quote_name
+        table = qn(Actor._meta.db_table)
+        character = qn("character")
+        fold = "name_fold COLLATE utf8mb4_0900_ai_ci"
+        # SQL mirror of split_name_character(): a character still embedded in the name
+        # ("Name (Character)" / "Name as Character") counts as a character, and such a
+        # name (or one with surrounding whitespace) is not clean.
+        embedded = (
+            f"({character} = '' AND (REGEXP_LIKE(name, '\\\\S.*\\\\([^)]*[^)\\\\s][^)]*\\\\)\\\\s*$') "
+            f"OR REGEXP_LIKE(name, '\\\\sas\\\\s', 'i')))"
+        )
+        clean = f"(NOT {embedded} AND NOT REGEXP_LIKE(name, '^\\\\s|\\\\s$'))"
+        window = (
+            f"PARTITION BY title_id, {fold} "
+            f"ORDER BY (tmdb_id IS NOT NULL) DESC, (COALESCE(profile_path, '') <> '') DESC, "
+            f"({character} <> '' OR {embedded}) DESC, {clean} DESC, id ASC"
+        )
+
+        t0 = time.time()
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_actor_rank")
+            cur.execute(
+                f"CREATE TEMPORARY TABLE tmp_actor_rank (PRIMARY KEY (id), KEY (keep_id)) AS "
+                f"SELECT id, ROW_NUMBER() OVER ({window}) AS rn, FIRST_VALUE(id) OVER ({window}) AS keep_id "
+                f"FROM {table}"
+            )
+            cur.execute("SELECT COUNT(*), COUNT(DISTINCT keep_id) FROM tmp_actor_rank WHERE rn > 1")
+            to_delete, groups = cur.fetchone()
+            self.stdout.write(f"[sql] duplicate groups={groups} actors to delete={to_delete}")
+
+            if not dry and to_delete:
+                cur.execute(
+                    f"UPDATE {table} k JOIN ("
+                    f"  SELECT r.keep_id, MAX(o.tmdb_id) AS tmdb_id, "
+                    f"         MAX(NULLIF(o.profile_path, '')) AS profile_path, "
+                    f"         MAX(NULLIF(o.{character}, '')) AS {character} "
+                    f"  FROM tmp_actor_rank r JOIN {table} o ON o.id = r.id "
+                    f"  WHERE r.rn > 1 GROUP BY r.keep_id"
+                    f") d ON d.keep_id = k.id "
+                    f"SET k.tmdb_id = COALESCE(k.tmdb_id, d.tmdb_id), "
+                    f"    k.profile_path = COALESCE(NULLIF(k.profile_path, ''), d.profile_path), "
+                    f"    k.{character} = COALESCE(NULLIF(k.{character}, ''), d.{character}, '')"
+                )
+                updated = cur.rowcount
+                cur.execute(f"DELETE a FROM {table} a JOIN tmp_actor_rank r ON r.id = a.id WHERE r.rn > 1")
+                deleted = cur.rowcount
+                self.stdout.write(f"[sql] updated={updated} deleted={deleted}")
+
+            cur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_actor_rank")
+
+        elapsed = time.time() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"DONE fix_actor_duplicates (sql): merged_groups={groups} deleted={to_delete} "
+            f"dry_run={dry} elapsed={elapsed:.1f}s"
+        ))
 
-    @transaction.atomic
     def handle(self, *args, **opts):
         limit = int(opts["limit"])
         log_every = int(opts["log_every"])
         dry = bool(opts["dry_run"])
+        chunk_size = max(1, int(opts["chunk_size"]))
+
+        if opts["mode"] == "sql":
+            if limit > 0:
+                self.stdout.write(self.style.WARNING("--limit is ignored with --mode=sql"))
+            return self.handle_sql(dry)
 
         qs = Title.objects.all().only("id").order_by("id")
-        total_titles = qs.count() if limit <= 0 else min(qs.count(), limit)
         if limit > 0:
+            total_titles = limit
             qs = qs[:limit]
+        elif opts["no_progress"]:
+            total_titles = 0
+        else:
+            total_titles = qs.count()
 
         self.stdout.write(self.style.MIGRATE_HEADING(
             f"fix_actor_duplicates: titles={total_titles} dry_run={dry}"
@@ -95,104 +207,155 @@ class Command(BaseCommand):
         actors_deleted = 0
         actors_updated = 0
 
-        for title in qs:
-            processed += 1
-            actors = list(Actor.objects.filter(title_id=title.id).order_by("id"))
-            if not actors:
-                continue
-
-            groups = {}
-            for a in actors:
-                parsed_name, parsed_character = split_name_character(a.name, a.character)
-                base_norm = norm(parsed_name)
-                if not base_norm:
-                    continue
-                canonical_norm = fold_key(parsed_name)
-                key = fold_key(a.name_norm or parsed_name)
-                if not key:
-                    continue
-                groups.setdefault(key, []).append(
-                    ActorItem(
-                        actor=a,
-                        parsed_name=parsed_name,
-                        parsed_character=parsed_character,
-                        base_norm=base_norm,
-                        canonical_norm=canonical_norm,
+        title_id_iter = qs.values_list("id", flat=True).iterator(chunk_size=chunk_size)
+        for title_ids in chunked(title_id_iter, chunk_size):
+            # One query for every actor of the chunk instead of one per title.
+            actors_by_title = defaultdict(list)
+            actor_qs = (
+                Actor.objects
+                .filter(title_id__in=title_ids)
+                .only("id", "title_id", "name", "character", "tmdb_id", "profile_path", "name_norm")
+                .order_by("title_id", "id")
+            )
+            for a in actor_qs:
+                actors_by_title[a.title_id].append(a)
+
+            to_delete = []
+            to_update = {}
+
+            for title_id in title_ids:
+                processed += 1
+                # Progress is logged before the early `continue`s below so it is never skipped.
+                if processed % log_every == 0 or processed == total_titles:
+                    elapsed = time.time() - t0
+                    rate = processed / elapsed if elapsed > 0 else 0
+                    remaining = max(0, total_titles - processed)
+                    eta = (remaining / rate) if rate > 0 else 0
+                    self.stdout.write(
+                        f"[{processed}/{total_titles or '?'}] merged_groups={groups_merged} "
+                        f"deleted={actors_deleted} updated={actors_updated} "
+                        f"rate={rate:.1f} titles/s ETA={eta/60:.1f}m"
                     )
-                )
+                actors = actors_by_title.get(title_id)
+                if not actors:
+                    continue
 
-            for _, items in groups.items():
-                if not items:
+                # Fast path: a lone actor has nothing to merge, only its own normalization.
+                if len(actors) == 1:
+                    a = actors[0]
+                    parsed_name, parsed_character = split_name_character(a.name, a.character)
+                    target_norm = fold_key(parsed_name) or norm(parsed_name)
+                    if not target_norm or (a.name_norm and not fold_key(a.name_norm)):
+                        continue
+                    changed = False
+                    if parsed_name and a.name != parsed_name:
+                        a.name = parsed_name
+                        changed = True
+                    if a.name_norm != target_norm:
+                        a.name_norm = target_norm
+                        changed = True
+                    if not a.character and parsed_character:
+                        a.character = parsed_character
+                        changed = True
+                    if changed:
+                        to_update[a.id] = a
+                        actors_updated += 1
                     continue
-                # Expand with any exact name_norm conflicts for this normalized key.
-                target_norm = items[0].canonical_norm or items[0].base_norm
-                if target_norm:
-                    conflicts = (
-                        Actor.objects
-                        .filter(title_id=title.id, name_norm=target_norm)
-                        .exclude(id__in=[it.actor.id for it in items])
-                    )
-                    for a in conflicts:
-                        parsed_name, parsed_character = split_name_character(a.name, a.character)
-                        items.append(
-                            ActorItem(
-                                actor=a,
-                                parsed_name=parsed_name,
-                                parsed_character=parsed_character,
-                                base_norm=norm(parsed_name),
-                                canonical_norm=fold_key(parsed_name),
-                            )
-                        )
 
-                keep = pick_keep(items)
-                changed = False
+                deleted_ids = set()
 
-                # Merge data into keep, delete the rest.
-                for it in items:
-                    a = it.actor
-                    if a.id == keep.actor.id:
+                groups = {}
+                for a in actors:
+                    parsed_name, parsed_character = split_name_character(a.name, a.character)
+                    base_norm = norm(parsed_name)
+                    if not base_norm:
                         continue
+                    canonical_norm = fold_key(parsed_name)
+                    key = fold_key(a.name_norm) if a.name_norm else canonical_norm
+                    if not key:
+                        continue
+                    groups.setdefault(key, []).append(
+                        ActorItem(
+                            actor=a,
+                            parsed_name=parsed_name,
+                            parsed_character=parsed_character,
+                            base_norm=base_norm,
+                            canonical_norm=canonical_norm,
+                        )
+                    )
 
-                    if not keep.actor.tmdb_id and a.tmdb_id:
-                        keep.actor.tmdb_id = a.tmdb_id
+                for _, items in groups.items():
+                    if not items:
+                        continue
+                    # Expand with any exact name_norm conflicts for this normalized key.
+                    target_norm = items[0].canonical_norm or items[0].base_norm
+                    if target_norm:
+                        # Conflicts come from the chunk prefetch, not a per-group SELECT.
+                        item_ids = {it.actor.id for it in items}
+                        conflicts = [
+                            a for a in actors
+                            if a.name_norm == target_norm and a.id not in item_ids and a.id not in deleted_ids
+                        ]
+                        for a in conflicts:
+                            parsed_name, parsed_character = split_name_character(a.name, a.character)
+                            items.append(
+                                ActorItem(
+                                    actor=a,
+                                    parsed_name=parsed_name,
+                                    parsed_character=parsed_character,
+                                    base_norm=norm(parsed_name),
+                                    canonical_norm=fold_key(parsed_name),
+                                )
+                            )
+
+                    keep = pick_keep(items)
+                    changed = False
+
+                    # Merge data into keep, delete the rest.
+                    for it in items:
+                        a = it.actor
+                        if a.id == keep.actor.id:
+                            continue
+
+                        if not keep.actor.tmdb_id and a.tmdb_id:
+                            keep.actor.tmdb_id = a.tmdb_id
+                            changed = True
+                        if not keep.actor.profile_path and a.profile_path:
+                            keep.actor.profile_path = a.profile_path
+                            changed = True
+                        if not keep.actor.character and it.parsed_character:
+                            keep.actor.character = it.parsed_character
+                            changed = True
+
+                        deleted_ids.add(a.id)
+                        to_delete.append(a.id)
+                        actors_deleted += 1
+
+                    # Normalize keep name + name_norm + character
+                    if keep.actor.name != keep.parsed_name and keep.parsed_name:
+                        keep.actor.name = keep.parsed_name
                         changed = True
-                    if not keep.actor.profile_path and a.profile_path:
-                        keep.actor.profile_path = a.profile_path
+                    target_norm = keep.canonical_norm or base_norm
+                    if keep.actor.name_norm != target_norm:
+                        keep.actor.name_norm = target_norm
                         changed = True
-                    if not keep.actor.character and it.parsed_character:
-                        keep.actor.character = it.parsed_character
+                    if not keep.actor.character and keep.parsed_character:
+                        keep.actor.character = keep.parsed_character
                         changed = True
 
-                    if not dry:
-                        a.delete()
-                    actors_deleted += 1
-
-                # Normalize keep name + name_norm + character
-                if keep.actor.name != keep.parsed_name and keep.parsed_name:
-                    keep.actor.name = keep.parsed_name
-                    changed = True
-                target_norm = keep.canonical_norm or base_norm
-                if keep.actor.name_norm != target_norm:
-                    keep.actor.name_norm = target_norm
-                    changed = True
-                if not keep.actor.character and keep.parsed_character:
-                    keep.actor.character = keep.parsed_character
-                    changed = True
-
-                if changed:
-                    if not dry:
-                        try:
-                            keep.actor.save()
-                        except IntegrityError:
-                            conflict = (
-                                Actor.objects
-                                .filter(title_id=title.id, name_norm=target_norm)
-                                .exclude(id=keep.actor.id)
-                                .order_by("id")
-                                .first()
-                            )
-                            if not conflict:
-                                raise
+                    if changed:
+                        # Pre-detect (title, name_norm) collisions against the in-memory state
+                        # (which includes pending updates) instead of catching IntegrityError on save.
+                        conflict = next(
+                            (
+                                a for a in actors
+                                if a.name_norm == target_norm and a.id != keep.actor.id and a.id not in deleted_ids
+                            ),
+                            None,
+                        )
+                        if conflict is None:
+                            to_update[keep.actor.id] = keep.actor
+                        else:
                             # Merge keep into conflict, then drop keep to satisfy unique constraint.
                             conflict_changed = False
                             if not conflict.tmdb_id and keep.actor.tmdb_id:
@@ -207,28 +370,31 @@ class Command(BaseCommand):
                             if keep.parsed_name and conflict.name != keep.parsed_name:
                                 conflict.name = keep.parsed_name
                                 conflict_changed = True
-                            if conflict.name_norm != target_norm:
-                                conflict.name_norm = target_norm
-                                conflict_changed = True
                             if conflict_changed:
-                                conflict.save()
-                            keep.actor.delete()
+                                to_update[conflict.id] = conflict
+                            deleted_ids.add(keep.actor.id)
+                            to_delete.append(keep.actor.id)
+                            to_update.pop(keep.actor.id, None)
                             actors_deleted += 1
-                    actors_updated += 1
-
-                if len(items) > 1:
-                    groups_merged += 1
-
-            if processed % log_every == 0 or processed == total_titles:
-                elapsed = time.time() - t0
-                rate = processed / elapsed if elapsed > 0 else 0
-                remaining = total_titles - processed
-                eta = (remaining / rate) if rate > 0 else 0
-                self.stdout.write(
-                    f"[{processed}/{total_titles}] merged_groups={groups_merged} "
-                    f"deleted={actors_deleted} updated={actors_updated} "
-                    f"rate={rate:.1f} titles/s ETA={eta/60:.1f}m"
-                )
+                        actors_updated += 1
+
+                    if len(items) > 1:
+                        groups_merged += 1
+
+            # Flush the chunk: one DELETE + batched UPDATEs instead of one query per actor.
+            if not dry:
+                deleted = set(to_delete)
+                dirty = [a for a_id, a in to_update.items() if a_id not in deleted]
+                with transaction.atomic():
+                    if to_delete:
+                        Actor.objects.filter(id__in=to_delete).delete()
+                    if dirty:
+                        Actor.objects.bulk_update(
+                            dirty,
+                            fields=["tmdb_id", "profile_path", "character", "name", "name_norm"],
+                            batch_size=1000,
+                        )
+            reset_queries()
 
         elapsed = time.time() - t0
         self.stdout.write(self.style.SUCCESS(
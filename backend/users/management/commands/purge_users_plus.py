@@ -1,11 +1,101 @@
 import time
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, models, transaction
 from django.contrib.auth import get_user_model
 
 from users.models import Profile, Subscription
 
 
+def like_prefix(prefix: str) -> str:
+    """LIKE pattern for emails starting with '<prefix>_' (wildcards escaped)."""
+    esc = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{esc}\\_%"
+
+
+def truncate_order(model, out=None, seen=None):
+    """Tables whose rows reference `model` (transitively), children first, then `model` itself."""
+    out = [] if out is None else out
+    seen = set() if seen is None else seen
+    if model in seen:
+        return out
+    seen.add(model)
+    for rel in model._meta.related_objects:
+        child = rel.through if rel.many_to_many else rel.related_model
+        truncate_order(child, out, seen)
+    for f in model._meta.local_many_to_many:
+        truncate_order(f.remote_field.through, out, seen)
+    if model._meta.db_table not in out:
+        out.append(model._meta.db_table)
+    return out
+
+
+def child_plan(model, chain=(), out=None, seen=None):
+    """
+    Rows hanging off `model` (transitively), deepest first, as (child, chain, action):
+    chain = FK fields from `child` up to `model`'s root. Mirrors the ORM's on_delete:
+    CASCADE children are walked and deleted, SET_NULL ones only detached.
+    """
+    out = [] if out is None else out
+    seen = set() if seen is None else seen
+    if model in seen:
+        return out
+    seen.add(model)
+
+    links = []
+    for rel in model._meta.related_objects:
+        if rel.many_to_many:
+            links.append((rel.through._meta.get_field(rel.field.m2m_reverse_field_name()), models.CASCADE))
+        else:
+            links.append((rel.field, rel.on_delete))
+    for f in model._meta.local_many_to_many:
+        links.append((f.remote_field.through._meta.get_field(f.m2m_field_name()), models.CASCADE))
+
+    for fk, on_delete in links:
+        child_chain = (fk, *chain)
+        if on_delete is models.SET_NULL:
+            out.append((fk.model, child_chain, "null"))
+        elif on_delete is models.CASCADE:
+            child_plan(fk.model, child_chain, out, seen)
+            out.append((fk.model, child_chain, "delete"))
+        elif on_delete is not models.DO_NOTHING:
+            raise CommandError(
+                f"--mode=single can't honour on_delete={on_delete.__name__} "
+                f"on {fk.model._meta.label}.{fk.name}. Use --mode=batched."
+            )
+    return out
+
+
+def join_sql(qn, chain):
+    """`child t0 JOIN ... JOIN root u` following `chain` (FK fields, child first)."""
+    parts = [f"{qn(chain[0].model._meta.db_table)} t0"]
+    for i, fk in enumerate(chain):
+        alias = "u" if i == len(chain) - 1 else f"t{i + 1}"
+        parts.append(
+            f"JOIN {qn(fk.remote_field.model._meta.db_table)} {alias} "
+            f"ON {alias}.{qn(fk.target_field.column)} = t{i}.{qn(fk.column)}"
+        )
+    return " ".join(parts)
+
+
+def _delete_chunk(db_alias: str, ids: list) -> int:
+    """Worker: delete one disjoint chunk of users (children first) on its own connection."""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    connections[db_alias].close()  # never reuse a connection inherited through fork
+    try:
+        with transaction.atomic(using=db_alias):
+            Profile.objects.using(db_alias).filter(user_id__in=ids).delete()
+            Subscription.objects.using(db_alias).filter(user_id__in=ids).delete()
+            User.objects.using(db_alias).filter(id__in=ids).delete()
+        return len(ids)
+    finally:
+        connections[db_alias].close()
+
+
 class Command(BaseCommand):
     help = "Purge users created by seed_users_plus_bench (by email prefix), in safe chunks."
 
@@ -14,6 +104,17 @@ class Command(BaseCommand):
         parser.add_argument("--batch", type=int, default=25_000, help="Chunk size for deletions.")
         parser.add_argument("--db", type=str, default="default")
         parser.add_argument("--disable-fk-checks", action="store_true", help="MySQL only. Can speed deletes; use carefully.")
+        parser.add_argument("--exact-count", action="store_true", help="COUNT(*) the matching users up front (slow on big tables); default uses the table-row estimate.")
+        parser.add_argument("--workers", type=int, default=4, help="Parallel delete processes for --mode=batched (1 = sequential; forced to 1 with --disable-fk-checks).")
+        parser.add_argument(
+            "--mode",
+            choices=["batched", "single", "truncate"],
+            default="batched",
+            help="batched = ORM chunks (safe for mixed data); single = one raw DELETE ... JOIN per "
+                 "table referencing users (profiles, subscriptions, payments, tokens, reco rows...), "
+                 "then the users; truncate = TRUNCATE every user table, only allowed when ALL users "
+                 "match the prefix.",
+        )
 
     def handle(self, *args, **opts):
         User = get_user_model()
@@ -21,19 +122,33 @@ class Command(BaseCommand):
         batch = int(opts["batch"])
         db_alias = opts["db"]
         disable_fk = bool(opts["disable_fk_checks"])
+        mode = opts["mode"]
+        workers = max(1, int(opts["workers"]))
+        exact_count = bool(opts["exact_count"])
 
         # We delete in chunks to avoid long locks / huge transactions.
-        user_qs = User.objects.using(db_alias).filter(email__startswith=f"{prefix}_").order_by("email")
+        user_qs = User.objects.using(db_alias).filter(email__startswith=f"{prefix}_")
 
-        total_users = user_qs.count()
-        if total_users == 0:
+        if not user_qs.exists():
             self.stdout.write(self.style.WARNING(f"No users found for prefix '{prefix}'. Nothing to purge."))
             return
 
+        # An exact COUNT(*) on email__startswith scans the whole index range; it only feeds logs.
+        total_users = user_qs.count() if exact_count else self._estimated_rows(User, db_alias)
+
         self.stdout.write(self.style.WARNING(
-            f"Purging users with prefix '{prefix}': {total_users:,} users (batch={batch:,}, db='{db_alias}')"
+            f"Purging users with prefix '{prefix}': {'' if exact_count else '<= ~'}{total_users:,} users "
+            f"(batch={batch:,}, db='{db_alias}')"
         ))
 
+        if mode == "truncate":
+            return self._purge_truncate(User, prefix, total_users, db_alias)
+        if mode == "single":
+            return self._purge_single(User, prefix, total_users, db_alias, disable_fk)
+        # FOREIGN_KEY_CHECKS is per-session, so parallel workers can't share it.
+        if workers > 1 and not disable_fk:
+            return self._purge_parallel(User, user_qs, total_users, batch, db_alias, workers)
+
         # Optional FK checks off (MySQL only). This can speed up but can be dangerous if you mix tables.
         if disable_fk:
             from django.db import connections
@@ -43,13 +158,17 @@ class Command(BaseCommand):
 
         t0 = time.perf_counter()
         deleted_users = 0
+        last_id = None
 
         try:
             while True:
-                # Pull a chunk of IDs (fast due to email index/ordering)
-                ids = list(user_qs.values_list("id", flat=True)[:batch])
+                # Keyset pagination: each chunk starts after the last id seen, so the scan
+                # never walks back over already-purged ranges.
+                page = user_qs if last_id is None else user_qs.filter(id__gt=last_id)
+                ids = list(page.order_by("id").values_list("id", flat=True)[:batch])
                 if not ids:
                     break
+                last_id = ids[-1]
 
                 # Delete children first (faster + less cascade work per row)
                 with transaction.atomic(using=db_alias):
@@ -77,3 +196,104 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(
             f"Done purge. Deleted ~{deleted_users:,} users in {total:,.1f}s (~{(deleted_users/total):,.0f} users/s)"
         ))
+
+    def _estimated_rows(self, User, db_alias) -> int:
+        """Table-level row estimate from MySQL statistics (upper bound for the prefix)."""
+        with connections[db_alias].cursor() as cur:
+            cur.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [User._meta.db_table],
+            )
+            row = cur.fetchone()
+        return int(row[0] or 0) if row else 0
+
+    def _purge_parallel(self, User, user_qs, total_users, batch, db_alias, workers):
+        ids = list(user_qs.order_by("id").values_list("id", flat=True))
+        total_users = len(ids)  # exact for free now
+        id_chunks = [ids[i:i + batch] for i in range(0, len(ids), batch)]
+        self.stdout.write(f"Parallel purge: chunks={len(id_chunks):,} workers={workers}")
+
+        # Children are forked: drop our connection first so none is shared.
+        connections.close_all()
+
+        t0 = time.perf_counter()
+        deleted_users = 0
+        ctx = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(_delete_chunk, db_alias, chunk) for chunk in id_chunks]
+            for fut in as_completed(futures):
+                deleted_users += fut.result()
+                elapsed = time.perf_counter() - t0
+                rate = deleted_users / elapsed if elapsed > 0 else 0
+                self.stdout.write(
+                    f"[OK] deleted_users={deleted_users:,}/{total_users:,} elapsed={elapsed:,.1f}s rate={rate:,.0f} users/s"
+                )
+
+        total = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done purge. Deleted ~{deleted_users:,} users in {total:,.1f}s (~{(deleted_users/total):,.0f} users/s)"
+        ))
+
+    def _purge_single(self, User, prefix, total_users, db_alias, disable_fk):
+        conn = connections[db_alias]
+        qn = conn.ops.quote_name
+        users = qn(User._meta.db_table)
+        pattern = like_prefix(prefix)
+
+        # every table pointing at users (directly or through profiles/tokens), children first,
+        # so the final DELETE never hits a foreign key
+        plan = child_plan(User)
+
+        t0 = time.perf_counter()
+        with transaction.atomic(using=db_alias), conn.cursor() as cur:
+            if disable_fk:
+                cur.execute("SET FOREIGN_KEY_CHECKS=0;")
+            try:
+                for child, chain, action in plan:
+                    table = child._meta.db_table
+                    if action == "null":
+                        cur.execute(
+                            f"UPDATE {join_sql(qn, chain)} SET t0.{qn(chain[0].column)} = NULL "
+                            f"WHERE u.email LIKE %s",
+                            [pattern],
+                        )
+                        self.stdout.write(f"[OK] {table}: detached={cur.rowcount:,}")
+                    else:
+                        cur.execute(f"DELETE t0 FROM {join_sql(qn, chain)} WHERE u.email LIKE %s", [pattern])
+                        self.stdout.write(f"[OK] {table}: deleted={cur.rowcount:,}")
+                cur.execute(f"DELETE FROM {users} WHERE email LIKE %s", [pattern])
+                deleted_users = cur.rowcount
+            finally:
+                if disable_fk:
+                    cur.execute("SET FOREIGN_KEY_CHECKS=1;")
+
+        total = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done purge (single). Deleted {deleted_users:,}/{total_users:,} users in {total:,.1f}s"
+        ))
+
+    def _purge_truncate(self, User, prefix, total_users, db_alias):
+        conn = connections[db_alias]
+        qn = conn.ops.quote_name
+        if User.objects.using(db_alias).exclude(email__startswith=f"{prefix}_").exists():
+            raise CommandError(
+                f"--mode=truncate refused: some users do not match prefix '{prefix}'. Use --mode=batched."
+            )
+
+        tables = truncate_order(User)
+        self.stdout.write(self.style.WARNING(f"Truncating: {', '.join(tables)}"))
+
+        t0 = time.perf_counter()
+        # TRUNCATE is DDL on MySQL (implicit commit, no CASCADE): run with FK checks off.
+        with conn.cursor() as cur:
+            cur.execute("SET FOREIGN_KEY_CHECKS=0;")
+            try:
+                for table in tables:
+                    cur.execute(f"TRUNCATE TABLE {qn(table)}")
+            finally:
+                cur.execute("SET FOREIGN_KEY_CHECKS=1;")
+
+        total = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done purge (truncate). Removed {total_users:,} users in {total:,.1f}s"
+        ))
@@ -1,19 +1,33 @@
 # users/management/commands/rebuild_title_indexes.py
-import re
+import sys
 import unicodedata
+from functools import lru_cache
 from datetime import timedelta
 import json
-import ast
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import orjson  # optional, faster JSON parsing
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, connections, transaction
+from django.db.models.constants import OnConflict
 from django.utils import timezone
 
+from users.management.commands.fix_actor_duplicates import norm, split_name_character
 from users.models import (
     Title,
     TVShowExtras,
-    TitleActor,
+    Actor,
     TitleKeyword,
     TitleCompany,
     TitleCountry,
@@ -21,17 +35,29 @@ from users.models import (
 )
 
 # ---------- Normalization ----------
-_space_re = re.compile(r"\s+")
+# Deletes every combining mark in one C-level str.translate pass.
+# (encode("ascii", "ignore") would be faster but drops non-Latin names entirely.)
+_STRIP_COMBINING = {cp: None for cp in range(sys.maxunicode + 1) if unicodedata.combining(chr(cp))}
 
 def norm_text(s: str) -> str:
     """Lowercase, remove accents, normalize spaces."""
     if not s:
         return ""
-    s = str(s).strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    s = _space_re.sub(" ", s)
-    return s
+    # str() first so non-hashable items (dicts) can still go through the cache.
+    return _norm_text_cached(str(s))
+
+@lru_cache(maxsize=200_000)
+def _norm_text_cached(s: str) -> str:
+    # Same names (companies, keywords, actors) recur across thousands of titles.
+    # Whitespace is collapsed with split()/join (C-level, also strips the ends)
+    # rather than a Unicode-aware \s+ regex.
+    s = s.lower()
+    if s.isascii():
+        # Nothing to decompose or strip (most TMDb names).
+        return " ".join(s.split())
+    if not unicodedata.is_normalized("NFKD", s):
+        s = unicodedata.normalize("NFKD", s)
+    return " ".join(s.translate(_STRIP_COMBINING).split())
 
 def to_list(value):
     """
@@ -55,23 +81,15 @@ def to_list(value):
         s = value.strip()
         if not s:
             return []
-        # try JSON / python literal
+        # try JSON (orjson/json decode errors are both ValueError)
         if (s.startswith("[") and s.endswith("]")) or (s.startswith("{") and s.endswith("}")):
             try:
-                obj = json.loads(s)
-                if isinstance(obj, list):
-                    return obj
-                if isinstance(obj, dict):
-                    return [obj]
-            except Exception:
-                pass
-            try:
-                obj = ast.literal_eval(s)
+                obj = _json_loads(s)
                 if isinstance(obj, list):
                     return obj
                 if isinstance(obj, dict):
                     return [obj]
-            except Exception:
+            except ValueError:
                 pass
 
         # fallback: comma-separated
@@ -80,6 +98,12 @@ def to_list(value):
 
     return []
 
+def extract_company_names_fast(value):
+    """TMDb shape only: list[{"name": str, ...}]. Raises on anything else."""
+    names = [item["name"].strip() for item in value]
+    return [n for n in names if n]
+
+
 def extract_company_names(value):
     """
     production_companies can be:
@@ -89,6 +113,11 @@ def extract_company_names(value):
       - JSON string version of above
     Returns list[str] of company names.
     """
+    if type(value) is list:
+        try:
+            return extract_company_names_fast(value)
+        except (TypeError, KeyError, AttributeError):
+            pass  # not the TMDb shape: generic path below
     out = []
     for item in to_list(value):
         if isinstance(item, str):
@@ -102,6 +131,12 @@ def extract_company_names(value):
     return out
 
 
+def extract_country_codes_fast(value):
+    """TMDb shape only: list[{"iso_3166_1": str, ...}]. Raises on anything else."""
+    codes = [item["iso_3166_1"].strip().upper() for item in value]
+    return [c for c in codes if len(c) == 2 and c.isalpha()]
+
+
 def extract_country_codes(value):
     """
     production_countries can be:
@@ -110,6 +145,11 @@ def extract_country_codes(value):
     - ["United States", ...]  (worst case)
     We prefer ISO2 codes if present; otherwise skip non-ISO2.
     """
+    if type(value) is list:
+        try:
+            return extract_country_codes_fast(value)
+        except (TypeError, KeyError, AttributeError):
+            pass  # not the TMDb shape: generic path below
     out = []
     if value is None:
         return out
@@ -132,6 +172,191 @@ def extract_country_codes(value):
     return out
 
 
+def extract_actors(value):
+    """
+    cast can be ["Name", ...] or TMDb credits [{"name", "character", "id", "profile_path"}, ...].
+    Returns list[(name, character, tmdb_id, profile_path)], parsed like populate_actors.
+    """
+    out = []
+    for item in to_list(value):
+        if isinstance(item, str):
+            name, character, tmdb_id, profile_path = item, "", None, None
+        elif isinstance(item, dict):
+            name = str(item.get("name") or item.get("original_name") or "")
+            character = str(item.get("character") or "")
+            tmdb_id = item.get("id") or item.get("tmdb_id")
+            profile_path = item.get("profile_path")
+        else:
+            continue
+        name, character = split_name_character(name, character)
+        if name:
+            out.append((name, character, tmdb_id, profile_path))
+    return out
+
+
+def iter_chunks(qs, batch):
+    """
+    Yield lists of at most `batch` rows from a .values() qs, walking the PK (keyset).
+    Stops on a short batch, so the trailing empty query is never issued.
+    """
+    qs = qs.order_by("id")
+    last_id = None
+    while True:
+        chunk_qs = qs.filter(id__gt=last_id) if last_id is not None else qs
+        chunk = list(chunk_qs[:batch])
+        if chunk:
+            yield chunk
+        if len(chunk) < batch:
+            return
+        last_id = chunk[-1]["id"]
+
+
+# Placeholder limit of a single prepared statement: batches are sized per table to stay under it.
+MAX_PLACEHOLDERS = 65535
+
+
+def insert_index_rows(model, fields, rows):
+    """
+    Raw multi-row INSERT IGNORE of (title_id, *fields) tuples into an index table
+    (INSERT OR IGNORE / ON CONFLICT DO NOTHING outside MySQL, via connection.ops).
+    These tables have a few small columns, so bulk_create's per-instance work
+    dominates; mysqlclient folds executemany into multi-row INSERTs.
+    """
+    ops = connection.ops
+    qn = ops.quote_name
+    columns = [model._meta.get_field("title").column] + [model._meta.get_field(f).column for f in fields]
+    sql = (
+        f"{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {qn(model._meta.db_table)} "
+        f"({', '.join(qn(c) for c in columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"{ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}"
+    ).rstrip()
+    batch_size = MAX_PLACEHOLDERS // len(columns)
+    with connection.cursor() as cur:
+        for i in range(0, len(rows), batch_size):
+            cur.executemany(sql, rows[i : i + batch_size])
+
+
+def bulk_insert(model, fields, rows):
+    """
+    Write-phase worker: the five index tables are disjoint, so each one is
+    inserted from its own thread (and thus its own DB connection).
+    """
+    try:
+        insert_index_rows(model, fields, rows)
+    finally:
+        # Thread-local connection: close it so pool threads don't leak sessions.
+        connection.close()
+
+
+def build_index_rows(chunk, extras_map):
+    """
+    Pure-CPU part of a chunk (JSON parsing + normalization): title dicts in,
+    (title_id, ...) tuples per index table out. Runs in worker processes.
+    """
+    actors_rows = []
+    keyword_rows = []
+    company_rows = []
+    country_rows = []
+    network_rows = []
+    # Bound methods hoisted out of the per-title loop (no attribute lookup per row).
+    add_actor = actors_rows.append
+    add_keyword = keyword_rows.append
+    add_company = company_rows.append
+    add_country = country_rows.append
+    add_network = network_rows.append
+    get_networks = extras_map.get
+
+    # Values are de-duplicated per title (dict.fromkeys keeps order) so we
+    # don't ship rows that INSERT IGNORE would just drop.
+    for t in chunk:
+        tid = t["id"]
+
+        # Actors: Actor rows keyed like populate_actors (uniq_actor_per_title on name_norm)
+        seen = set()
+        for name, character, tmdb_id, profile_path in extract_actors(t["cast"]):
+            na = norm(name)
+            if na not in seen:
+                seen.add(na)
+                add_actor((tid, name, na, character, tmdb_id, profile_path))
+
+        # Keywords
+        for nkw in dict.fromkeys(norm_text(kw) for kw in to_list(t["keywords"])):
+            if nkw:
+                add_keyword((tid, nkw))
+
+        # Companies
+        for nc in dict.fromkeys(norm_text(c) for c in extract_company_names(t["production_companies"])):
+            if nc:
+                add_company((tid, nc))
+
+        # Countries (ISO2 only)
+        for cc in dict.fromkeys(extract_country_codes(t["production_countries"])):
+            add_country((tid, cc))
+
+        # Networks from TVShowExtras
+        network_names = get_networks(tid)
+        if network_names:
+            for nn in dict.fromkeys(norm_text(n) for n in to_list(network_names)):
+                if nn:
+                    add_network((tid, nn))
+
+    return actors_rows, keyword_rows, company_rows, country_rows, network_rows
+
+
+def write_chunk(writes, write_workers):
+    """Insert one chunk's (model, fields, rows) triples."""
+    if write_workers > 1 and len(writes) > 1:
+        # No cross-table transaction here: rows are idempotent (INSERT IGNORE),
+        # so a failed chunk is simply re-run.
+        with ThreadPoolExecutor(max_workers=min(write_workers, len(writes))) as pool:
+            futures = [pool.submit(bulk_insert, *w) for w in writes]
+            for f in futures:
+                f.result()
+    else:
+        with transaction.atomic():
+            for model, fields, rows in writes:
+                insert_index_rows(model, fields, rows)
+
+
+class ChunkWriter(threading.Thread):
+    """
+    Consumer side of the ingest pipeline: the main thread normalizes chunk N+1
+    while this thread writes chunk N. The bounded queue keeps at most `depth`
+    chunks in memory; a write error stops further writes and is re-raised by close().
+    """
+
+    def __init__(self, write_workers, depth=2):
+        super().__init__(daemon=True)
+        self.write_workers = write_workers
+        self.q = queue.Queue(maxsize=depth)
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                writes = self.q.get()
+                if writes is None:
+                    return
+                if self.error is None:
+                    try:
+                        write_chunk(writes, self.write_workers)
+                    except Exception as e:
+                        self.error = e
+        finally:
+            connection.close()
+
+    def put(self, writes):
+        if self.error is not None:
+            raise self.error
+        self.q.put(writes)
+
+    def close(self):
+        self.q.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
 # ---------- Command ----------
 class Command(BaseCommand):
     help = "Rebuild / populate Title index tables (actors/keywords/companies/countries/networks) from JSON fields."
@@ -141,17 +366,24 @@ class Command(BaseCommand):
         parser.add_argument("--rebuild", action="store_true", help="Delete all index rows before rebuilding")
         parser.add_argument("--since-days", type=int, default=None, help="Only process titles updated in the last N days")
         parser.add_argument("--dry-run", action="store_true", help="Do not write to DB (print counts only)")
+        parser.add_argument("--write-workers", type=int, default=5, help="Parallel insert threads per chunk (1 = sequential, single transaction)")
+        parser.add_argument("--procs", type=int, default=os.cpu_count() or 1, help="Worker processes for JSON parsing/normalization (1 = in-process)")
+        parser.add_argument("--no-count", action="store_true", help="Skip the initial COUNT(*) (progress shows '?')")
 
     def handle(self, *args, **opts):
         batch = opts["batch"]
         rebuild = opts["rebuild"]
         since_days = opts["since_days"]
         dry_run = opts["dry_run"]
+        no_count = opts["no_count"]
+        write_workers = max(1, opts["write_workers"])
+        procs = max(1, opts["procs"])
 
         if rebuild and since_days is not None:
             self.stdout.write(self.style.WARNING("Using --rebuild with --since-days: --since-days will be ignored."))
 
-        qs = Title.objects.all().only(
+        # Plain dicts: we only read these fields, no need for model instances.
+        qs = Title.objects.all().values(
             "id",
             "type",
             "cast",
@@ -164,8 +396,9 @@ class Command(BaseCommand):
             cutoff = timezone.now() - timedelta(days=since_days)
             qs = qs.filter(updated_at__gte=cutoff)
 
-        total = qs.count()
-        self.stdout.write(f"[INDEX] Titles to process: {total}")
+        # The count only feeds the progress banner; keyset pagination below doesn't need it.
+        total = None if no_count else qs.count()
+        self.stdout.write(f"[INDEX] Titles to process: {total if total is not None else '?'}")
 
         if rebuild:
             if dry_run:
@@ -173,7 +406,7 @@ class Command(BaseCommand):
             else:
                 self.stdout.write("[INDEX] Deleting existing index rows...")
                 with transaction.atomic():
-                    TitleActor.objects.all().delete()
+                    Actor.objects.all().delete()
                     TitleKeyword.objects.all().delete()
                     TitleCompany.objects.all().delete()
                     TitleCountry.objects.all().delete()
@@ -187,87 +420,86 @@ class Command(BaseCommand):
             "networks": 0,
         }
 
-        offset = 0
-        while True:
-            chunk = list(qs.order_by("id")[offset : offset + batch])
-            if not chunk:
-                break
+        # Fork the normalization workers before the writer thread exists and with
+        # no open connection, so children inherit neither.
+        pool = None
+        if procs > 1:
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=procs, mp_context=multiprocessing.get_context("fork"))
+            pool.submit(int).result()  # fork-context pools start all workers on first submit
+
+        writer = None
+        try:
+            if not dry_run:
+                writer = ChunkWriter(write_workers)
+                writer.start()
+            self._process(qs, batch, total, writer, created_counts, pool, procs)
+        finally:
+            if writer is not None:
+                writer.close()
+            if pool is not None:
+                pool.shutdown()
 
-            title_ids = [t.id for t in chunk]
+        self.stdout.write(self.style.SUCCESS("[DONE] Index build finished."))
+        self.stdout.write(f"Totals inserted-attempted (INSERT IGNORE may skip duplicates): {created_counts}")
 
+    def _read_chunks(self, qs, batch):
+        """Yield (chunk, extras_map); all DB reads stay in the main process."""
+        # Keyset pagination on the PK: each batch is an index range scan instead of
+        # an OFFSET that re-reads every previous row.
+        for chunk in iter_chunks(qs, batch):
             # Preload TVShowExtras network_names for tv titles
             extras_map = {}
-            tv_ids = [t.id for t in chunk if getattr(t, "type", "") == "tv"]
+            tv_ids = [t["id"] for t in chunk if t["type"] == "tv"]
             if tv_ids:
-                extras_map = {
-                    e.title_id: e for e in TVShowExtras.objects.filter(title_id__in=tv_ids).only("title_id", "network_names")
-                }
-
-            actors_rows = []
-            keyword_rows = []
-            company_rows = []
-            country_rows = []
-            network_rows = []
-
-            for t in chunk:
-                tid = t.id
-
-                # Actors
-                for a in to_list(getattr(t, "cast", None)):
-                    na = norm_text(a)
-                    if na:
-                        actors_rows.append(TitleActor(title_id=tid, name_norm=na))
-
-                # Keywords
-                for kw in to_list(getattr(t, "keywords", None)):
-                    nkw = norm_text(kw)
-                    if nkw:
-                        keyword_rows.append(TitleKeyword(title_id=tid, keyword_norm=nkw))
-
-                # Companies
-                for comp_name in extract_company_names(getattr(t, "production_companies", None)):
-                    nc = norm_text(comp_name)
-                    if nc:
-                        company_rows.append(TitleCompany(title_id=tid, company_norm=nc))
-
-                # Countries (ISO2 only)
-                for cc in extract_country_codes(getattr(t, "production_countries", None)):
-                    country_rows.append(TitleCountry(title_id=tid, country_code=cc))
-
-                # Networks from TVShowExtras
-                extra = extras_map.get(tid)
-                if extra:
-                    for n in to_list(getattr(extra, "network_names", None)):
-                        nn = norm_text(n)
-                        if nn:
-                            network_rows.append(TitleNetwork(title_id=tid, network_norm=nn))
-
-            if dry_run:
-                created_counts["actors"] += len(actors_rows)
-                created_counts["keywords"] += len(keyword_rows)
-                created_counts["companies"] += len(company_rows)
-                created_counts["countries"] += len(country_rows)
-                created_counts["networks"] += len(network_rows)
-            else:
-                with transaction.atomic():
-                    TitleActor.objects.bulk_create(actors_rows, ignore_conflicts=True, batch_size=5000)
-                    TitleKeyword.objects.bulk_create(keyword_rows, ignore_conflicts=True, batch_size=5000)
-                    TitleCompany.objects.bulk_create(company_rows, ignore_conflicts=True, batch_size=5000)
-                    TitleCountry.objects.bulk_create(country_rows, ignore_conflicts=True, batch_size=5000)
-                    TitleNetwork.objects.bulk_create(network_rows, ignore_conflicts=True, batch_size=5000)
-
-                created_counts["actors"] += len(actors_rows)
-                created_counts["keywords"] += len(keyword_rows)
-                created_counts["companies"] += len(company_rows)
-                created_counts["countries"] += len(country_rows)
-                created_counts["networks"] += len(network_rows)
-
-            offset += batch
+                extras_map = dict(
+                    TVShowExtras.objects.filter(title_id__in=tv_ids).values_list("title_id", "network_names")
+                )
+            yield chunk, extras_map
+
+    def _built_chunks(self, qs, batch, pool, procs):
+        """Yield (n_titles, rows) in id order, normalizing up to 2*procs chunks ahead."""
+        if pool is None:
+            for chunk, extras_map in self._read_chunks(qs, batch):
+                yield len(chunk), build_index_rows(chunk, extras_map)
+            return
+        pending = deque()
+        for chunk, extras_map in self._read_chunks(qs, batch):
+            pending.append((len(chunk), pool.submit(build_index_rows, chunk, extras_map)))
+            if len(pending) >= 2 * procs:
+                n, fut = pending.popleft()
+                yield n, fut.result()
+        while pending:
+            n, fut = pending.popleft()
+            yield n, fut.result()
+
+    def _process(self, qs, batch, total, writer, created_counts, pool=None, procs=1):
+        processed = 0
+        for n_titles, built in self._built_chunks(qs, batch, pool, procs):
+            actors_rows, keyword_rows, company_rows, country_rows, network_rows = built
+
+            if writer is not None:
+                writer.put([
+                    (model, fields, rows)
+                    for model, fields, rows in (
+                        (Actor, ("name", "name_norm", "character", "tmdb_id", "profile_path"), actors_rows),
+                        (TitleKeyword, ("keyword_norm",), keyword_rows),
+                        (TitleCompany, ("company_norm",), company_rows),
+                        (TitleCountry, ("country_code",), country_rows),
+                        (TitleNetwork, ("network_norm",), network_rows),
+                    )
+                    if rows
+                ])
+
+            created_counts["actors"] += len(actors_rows)
+            created_counts["keywords"] += len(keyword_rows)
+            created_counts["companies"] += len(company_rows)
+            created_counts["countries"] += len(country_rows)
+            created_counts["networks"] += len(network_rows)
+
+            processed += n_titles
             self.stdout.write(
-                f"[OK] processed={min(offset, total)}/{total} "
+                f"[OK] processed={processed}/{total if total is not None else '?'} "
                 f"actors+{len(actors_rows)} kw+{len(keyword_rows)} comp+{len(company_rows)} "
                 f"cty+{len(country_rows)} net+{len(network_rows)}"
             )
-
-        self.stdout.write(self.style.SUCCESS("[DONE] Index build finished."))
-        self.stdout.write(f"Totals inserted-attempted (ignore_conflicts may skip duplicates): {created_counts}")
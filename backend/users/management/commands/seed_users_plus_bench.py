@@ -1,30 +1,30 @@
 import time
+from array import array
 import uuid
 import random
-import string
-from statistics import mean
+import secrets
+
+import numpy as np
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connections, transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from users.models import Profile, Subscription
 
 
-def rand_str(n=8):
-    return "".join(random.choices(string.ascii_lowercase + string.digits, k=n))
-
-
-def percentile(sorted_list, pct):
-    if not sorted_list:
-        return 0.0
-    k = (len(sorted_list) - 1) * (pct / 100.0)
-    f = int(k)
-    c = min(f + 1, len(sorted_list) - 1)
-    if f == c:
-        return float(sorted_list[f])
-    return float(sorted_list[f] * (c - k) + sorted_list[c] * (k - f))
+def raw_insert(db_alias, model, fields, rows):
+    """
+    Multi-row INSERT of already DB-ready tuples (no model instances, no per-field
+    conversion). mysqlclient folds executemany into multi-row INSERT statements.
+    """
+    conn = connections[db_alias]
+    qn = conn.ops.quote_name
+    cols = ", ".join(qn(model._meta.get_field(f).column) for f in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    with conn.cursor() as cur:
+        cur.executemany(f"INSERT INTO {qn(model._meta.db_table)} ({cols}) VALUES ({placeholders})", rows)
 
 
 class Command(BaseCommand):
@@ -82,6 +82,15 @@ class Command(BaseCommand):
         langs = ["en", "fr", "es"]
         ages = ["G", "PG", "13+", "16+", "18+"]
 
+        # Rows are written as raw tuples, so convert the non-trivial values to their
+        # DB representation once (UUID -> char(32) on MySQL, aware datetime -> UTC).
+        conn = connections[db_alias]
+        pk_field = User._meta.pk
+        now_db = User._meta.get_field("created_at").get_db_prep_save(now, conn)
+        renewal_db = Subscription._meta.get_field("renewal_date").get_db_prep_save(
+            now + timezone.timedelta(days=30), conn
+        )
+
         while created < count:
             remaining = count - created
             n = min(batch_size, remaining)
@@ -91,46 +100,48 @@ class Command(BaseCommand):
             profiles = []
             subs = []
 
-            for i in range(start_idx, start_idx + n):
-                # IMPORTANT: explicit UUID so we can reference user_id without DB roundtrips
-                uid = uuid.uuid4()
-                suffix = rand_str(8)
+            # Per-row randomness is drawn in bulk, outside the row loop.
+            # IMPORTANT: explicit UUIDs so we can reference user_id without DB roundtrips
+            uids = [uuid.UUID(int=random.getrandbits(128), version=4) for _ in range(n)]
+            suffixes = secrets.token_hex(4 * n)
+            ages_batch = random.choices(ages, k=n)
+            langs_batch = random.choices(langs, k=n)
+
+            for j, i in enumerate(range(start_idx, start_idx + n)):
+                uid = uids[j]
+                suffix = suffixes[8 * j : 8 * j + 8]
                 email = f"{prefix}_{i:012d}_{suffix}@example.com"
 
-                u = User(
-                    id=uid,
-                    email=email,
-                    name=f"{prefix} user {i}",
-                    is_active=True,
-                    is_staff=False,
-                )
-                u.password = password_hash
-                users.append(u)
-
-                profiles.append(Profile(
-                    user_id=uid,
-                    name=f"Profile {i}",
-                    age_restriction=random.choice(ages),
-                    avatar_url=None,
-                    language_preference=random.choice(langs),
+                uid_db = pk_field.get_db_prep_save(uid, conn)
+
+                # id, email, name, password, is_active, is_staff, is_superuser, last_login, created_at, updated_at
+                users.append((
+                    uid_db, email, f"{prefix} user {i}", password_hash,
+                    True, False, False, None, now_db, now_db,
                 ))
 
+                # user_id, name, age_restriction, avatar_url, language_preference
+                profiles.append((uid_db, f"Profile {i}", ages_batch[j], None, langs_batch[j]))
+
                 plan_type = "Premium" if (i % 2 == 0) else "Basic"
-                renewal = (now + timezone.timedelta(days=30)) if plan_type == "Premium" else None
-
-                subs.append(Subscription(
-                    user_id=uid,
-                    plan_id=plan_type,          # ton modèle a plan_id + plan_type :contentReference[oaicite:1]{index=1}
-                    plan_type=plan_type,
-                    renewal_date=renewal,
-                    status="Active",
-                    is_trial=False,
-                ))
+                renewal = renewal_db if plan_type == "Premium" else None
+
+                # user_id, plan_id, plan_type, start_date, renewal_date, status, is_trial
+                # (ton modèle a plan_id + plan_type)
+                subs.append((uid_db, plan_type, plan_type, now_db, renewal, "Active", False))
 
+            # Raw multi-row INSERTs instead of bulk_create: no 3M model instances.
             with transaction.atomic(using=db_alias):
-                User.objects.using(db_alias).bulk_create(users, batch_size=n)
-                Profile.objects.using(db_alias).bulk_create(profiles, batch_size=n)
-                Subscription.objects.using(db_alias).bulk_create(subs, batch_size=n)
+                raw_insert(db_alias, User, (
+                    "id", "email", "name", "password", "is_active", "is_staff",
+                    "is_superuser", "last_login", "created_at", "updated_at",
+                ), users)
+                raw_insert(db_alias, Profile, (
+                    "user", "name", "age_restriction", "avatar_url", "language_preference",
+                ), profiles)
+                raw_insert(db_alias, Subscription, (
+                    "user", "plan_id", "plan_type", "start_date", "renewal_date", "status", "is_trial",
+                ), subs)
 
             created += n
             elapsed = time.perf_counter() - t0
@@ -167,80 +178,121 @@ class Command(BaseCommand):
         # Pre-sample ids/emails for benchmark loops
         picks = [random.choice(sample_rows) for _ in range(bench_iters)]
 
-        timings_user_get = []
-        timings_profiles = []
-        timings_sub = []
-        timings_prefetch = []
+        # Integer nanoseconds in preallocated arrays: no float math or list growth
+        # inside the timed loops (matters for sub-ms queries). Converted to ms in report().
+        clock = time.perf_counter_ns
+        timings_user_get = array("q", bytes(8 * bench_iters))
+        timings_profiles = array("q", bytes(8 * bench_iters))
+        timings_sub = array("q", bytes(8 * bench_iters))
 
         # 1) user by email
-        for uid, email in picks:
-            t = time.perf_counter()
+        for k, (uid, email) in enumerate(picks):
+            t = clock()
             _ = User.objects.using(db_alias).only("id", "email", "name").get(email=email)
-            timings_user_get.append((time.perf_counter() - t) * 1000.0)
+            timings_user_get[k] = clock() - t
 
         # 2) profiles for user (typical “choose profile”)
-        for uid, email in picks:
-            t = time.perf_counter()
+        for k, (uid, email) in enumerate(picks):
+            t = clock()
             _ = list(Profile.objects.using(db_alias)
                      .filter(user_id=uid)
                      .only("id", "name", "age_restriction", "language_preference")
                      .order_by("id")[:4])
-            timings_profiles.append((time.perf_counter() - t) * 1000.0)
+            timings_profiles[k] = clock() - t
 
         # 3) subscription for user (typical “account status”)
-        for uid, email in picks:
-            t = time.perf_counter()
+        for k, (uid, email) in enumerate(picks):
+            t = clock()
             _ = (Subscription.objects.using(db_alias)
                  .filter(user_id=uid)
                  .only("id", "plan_type", "status", "renewal_date")
                  .order_by("-start_date")  # start_date auto_now_add :contentReference[oaicite:2]{index=2}
                  .first())
-            timings_sub.append((time.perf_counter() - t) * 1000.0)
+            timings_sub[k] = clock() - t
+
+        # Batched (throughput) variants: the same data for all picks in one IN query,
+        # i.e. what a request handler should do instead of querying in a loop.
+        # (label, elapsed_ns, picks served)
+        batched = []
+        pick_ids = list({uid for uid, _ in picks})
+
+        t = clock()
+        _ = (User.objects.using(db_alias)
+             .only("id", "email", "name")
+             .in_bulk([email for _, email in picks], field_name="email"))
+        batched.append(("User by email (in_bulk)", clock() - t, len(picks)))
+
+        t = clock()
+        profs_by_user = {}
+        for p in (Profile.objects.using(db_alias)
+                  .filter(user_id__in=pick_ids)
+                  .only("id", "user_id", "name", "age_restriction", "language_preference")
+                  .order_by("id")):
+            profs_by_user.setdefault(p.user_id, []).append(p)
+        batched.append(("Profiles by user (IN)", clock() - t, len(picks)))
+
+        t = clock()
+        subs_by_user = {}
+        for sub in (Subscription.objects.using(db_alias)
+                    .filter(user_id__in=pick_ids)
+                    .only("id", "user_id", "plan_type", "status", "renewal_date")
+                    .order_by("start_date")):
+            subs_by_user[sub.user_id] = sub  # latest start_date wins
+        batched.append(("Subscription by user (IN)", clock() - t, len(picks)))
 
         # 4) prefetch profiles+subs (pattern “load user account page in one go”)
-        # NOTE: reverse relations depend on related_name; by default it's profile_set/subscription_set.
-        for uid, email in picks:
-            t = time.perf_counter()
-            u = (User.objects.using(db_alias)
-                 .filter(id=uid)
-                 .prefetch_related("profile_set", "subscription_set")
-                 .only("id", "email")
-                 .first())
+        # iterator(chunk_size=500) prefetches per 500-user chunk (Django >= 4.1): a handful
+        # of queries instead of 3 per pick. NOTE: reverse relations depend on related_name; by default
+        # it's profile_set/subscription_set.
+        t = clock()
+        for u in (User.objects.using(db_alias)
+                  .filter(id__in=pick_ids)
+                  .prefetch_related("profile_set", "subscription_set")
+                  .only("id", "email")
+                  .iterator(chunk_size=500)):
             # touch them so prefetch actually runs
-            if u:
-                _ = len(list(u.profile_set.all()))
-                _ = len(list(u.subscription_set.all()))
-            timings_prefetch.append((time.perf_counter() - t) * 1000.0)
+            _ = len(u.profile_set.all())
+            _ = len(u.subscription_set.all())
+        batched.append(("User + prefetch (profiles+subs)", clock() - t, len(picks)))
 
         def report(name, arr):
-            arr_sorted = sorted(arr)
+            # Zero-copy view over the int64 ns array; percentiles use linear interpolation.
+            ms = np.frombuffer(arr, dtype=np.int64) / 1e6
+            if ms.size == 0:
+                return {"name": name, "avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            p50, p95 = np.percentile(ms, [50, 95])
             return {
                 "name": name,
-                "avg_ms": mean(arr_sorted),
-                "p50_ms": percentile(arr_sorted, 50),
-                "p95_ms": percentile(arr_sorted, 95),
-                "max_ms": arr_sorted[-1] if arr_sorted else 0.0,
+                "avg_ms": float(ms.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "max_ms": float(ms.max()),
             }
 
         r1 = report("User by email (get)", timings_user_get)
         r2 = report("Profiles by user (list)", timings_profiles)
         r3 = report("Subscription by user (first)", timings_sub)
-        r4 = report("User + prefetch (profiles+subs)", timings_prefetch)
 
         self.stdout.write("\n=== BENCH REPORT (ms) ===")
-        for r in (r1, r2, r3, r4):
+        for r in (r1, r2, r3):
             self.stdout.write(
                 f"- {r['name']}: avg={r['avg_ms']:.3f} | p50={r['p50_ms']:.3f} | p95={r['p95_ms']:.3f} | max={r['max_ms']:.3f}"
             )
 
         # Quick “QPS-ish”: based on total time for the arrays
-        total_ops = 4 * bench_iters
-        total_ms = sum(timings_user_get) + sum(timings_profiles) + sum(timings_sub) + sum(timings_prefetch)
-        total_s = total_ms / 1000.0
+        total_ops = 3 * bench_iters
+        total_ns = sum(timings_user_get) + sum(timings_profiles) + sum(timings_sub)
+        total_s = total_ns / 1e9
         qps = (total_ops / total_s) if total_s > 0 else 0.0
         self.stdout.write(self.style.SUCCESS(
             f"\nApprox throughput: {qps:,.0f} ops/sec (over {total_ops:,} ORM ops)"
         ))
+
+        self.stdout.write("\n=== BATCHED (one query for all picks) ===")
+        for name, ns, n in batched:
+            secs = ns / 1e9
+            rate = (n / secs) if secs > 0 else 0.0
+            self.stdout.write(f"- {name}: total={ns / 1e6:.3f}ms for {n:,} picks | {rate:,.0f} picks/sec")
         self.stdout.write(self.style.WARNING(
             "Tip: if p95 is bad, add composite indexes: Profile(user_id), Subscription(user_id, status/start_date)."
         ))
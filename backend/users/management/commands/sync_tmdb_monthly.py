@@ -3,12 +3,25 @@ import os
 import re
 import time
 import datetime
-from typing import Any, Dict, List, Optional, Tuple
+import functools
+import json
+import string
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import orjson  # optional, faster JSON parsing
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Count
 
 from users.models import Title, TVShowExtras, Season, Episode, Actor
@@ -72,19 +85,49 @@ def img_url(path: Optional[str], size: str = "original") -> str:
     return f"https://image.tmdb.org/t/p/{size}/{p}"
 
 
+def _compile_template(template: str) -> Callable[..., str]:
+    """
+    Parse a format string once into (literal, field) pairs and return a function
+    that only concatenates. Templates using conversions/format specs keep str.format.
+    """
+    parts = []
+    for literal, field, spec, conv in string.Formatter().parse(template):
+        if spec or conv:
+            return lambda **kw: template.format(**kw)
+        parts.append((literal, field))
+
+    def render(**kw) -> str:
+        out = []
+        for literal, field in parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(kw[field]))
+        return "".join(out)
+
+    return render
+
+
+# The provider URLs (some very long) are formatted once per title/episode.
+_TEMPLATE_FNS: Dict[str, Callable[..., str]] = {t: _compile_template(t) for t in TEMPLATES.values()}
+
+
 def fmt(template: str, tmdb_id: int, season: Optional[int] = None, episode: Optional[int] = None) -> str:
     if not template or not tmdb_id:
         return ""
     try:
-        return template.format(tmdb_id=tmdb_id, season=season, episode=episode)
+        render = _TEMPLATE_FNS.get(template) or _compile_template(template)
+        return render(tmdb_id=tmdb_id, season=season, episode=episode)
     except Exception:
         return ""
 
 
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=16384)
 def norm(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
+    # Whitespace is non-alnum, so one sub already leaves single spaces only.
+    return _NON_ALNUM_RE.sub(" ", (s or "").lower()).strip()
 
 
 def primary_genre_norm_from_genre_string(genre_str: str) -> str:
@@ -107,46 +150,64 @@ def fill_field(obj, field: str, new_val, overwrite: bool) -> bool:
             return True
         return False
 
-    if (curr in (None, "", [])) and (new_val not in (None, "", [])):
+    # explicit comparisons: hot path, and `x in (None, "", [])` rebuilds the tuple on every call
+    if curr is None or curr == "" or curr == []:
+        if new_val is None or new_val == "" or new_val == []:
+            return False
         setattr(obj, field, new_val)
         return True
 
     return False
 
 
-def tmdb_trailer_url(full: dict) -> str:
-    for v in (full.get("videos") or {}).get("results", []) or []:
+class TMDbDerived(NamedTuple):
+    genre: str
+    trailer_url: str
+    director: str
+    cast: List[str]
+    keywords: List[str]
+    production_companies: List[dict]
+    production_countries: List[str]
+    spoken_languages: List[str]
+
+
+def extract_full(full: dict, is_tv: bool, cast_limit: int = 10) -> TMDbDerived:
+    """Derive every list/str field of a Title row in a single walk of the TMDB payload."""
+    genre = ", ".join([n for n in (g.get("name") for g in (full.get("genres") or [])) if n])
+
+    trailer_url = ""
+    for v in (full.get("videos") or {}).get("results") or []:
         if v.get("site") == "YouTube" and v.get("type") == "Trailer":
             key = v.get("key")
             if key:
-                return f"https://www.youtube.com/watch?v={key}"
-    return ""
+                trailer_url = f"https://www.youtube.com/watch?v={key}"
+                break
 
+    credits = full.get("credits") or {}
 
-def tmdb_director_from_credits(full: dict) -> str:
-    for c in (full.get("credits") or {}).get("crew", []) or []:
-        if c.get("job") == "Director":
-            return c.get("name") or ""
-    return ""
+    director = ""
+    if not is_tv:  # TV director isn't stable like movies
+        for c in credits.get("crew") or []:
+            if c.get("job") == "Director":
+                director = c.get("name") or ""
+                break
 
-
-def tmdb_cast_names(full: dict, limit: int = 10) -> List[str]:
-    out = []
-    for c in (full.get("credits") or {}).get("cast", []) or []:
+    cast: List[str] = []
+    for c in credits.get("cast") or []:
         n = c.get("name")
         if n:
-            out.append(n)
-        if len(out) >= limit:
-            break
-    return out
-
+            cast.append(n)
+            if len(cast) >= cast_limit:
+                break
 
-def tmdb_movie_keywords(full: dict) -> List[str]:
-    return [k.get("name") for k in ((full.get("keywords") or {}).get("keywords") or []) if k.get("name")]
+    kw = full.get("keywords") or {}
+    keywords = [n for n in (k.get("name") for k in (kw.get("results" if is_tv else "keywords") or [])) if n]
 
+    companies = [{"id": c.get("id"), "name": c.get("name")} for c in (full.get("production_companies") or [])]
+    countries = [n for n in (c.get("name") for c in (full.get("production_countries") or [])) if n]
+    languages = [n for n in (l.get("name") for l in (full.get("spoken_languages") or [])) if n]
 
-def tmdb_tv_keywords(full: dict) -> List[str]:
-    return [k.get("name") for k in ((full.get("keywords") or {}).get("results") or []) if k.get("name")]
+    return TMDbDerived(genre, trailer_url, director, cast, keywords, companies, countries, languages)
 
 
 def movie_title_links(tmdb_id: int, imdb_code: Optional[str]) -> Dict[str, str]:
@@ -185,8 +246,33 @@ def episode_links(tv_tmdb_id: int, season: int, episode: int) -> Dict[str, str]:
     }
 
 
+class TokenBucket:
+    """
+    Thread-safe rate limiter shared by all fetch threads.
+    Defaults match TMDb's ~40 requests / 10 seconds cap.
+    """
+    def __init__(self, capacity: int = 40, refill: float = 40 / 10.0):
+        self.capacity = float(capacity)
+        self.refill = float(refill)  # tokens per second
+        self._tokens = float(capacity)
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.refill)
+                self._ts = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.refill
+            time.sleep(wait)
+
+
 class TMDbClient:
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 30):
+    def __init__(self, api_key: Optional[str] = None, timeout: int = 30, bucket: Optional[TokenBucket] = None):
         # Prefer env, else settings, else user constant if you put it in settings.py
         self.api_key = (
             api_key
@@ -199,15 +285,71 @@ class TMDbClient:
 
         self.base = "https://api.themoviedb.org/3"
         self.timeout = timeout
+        self.bucket = bucket
+        # Session is shared by the fetch threads: size its pool for them.
+        # 429/5xx are retried with exponential backoff (honoring Retry-After)
+        # instead of losing the title.
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+        )
         self.s = requests.Session()
+        # api_key rides on every request: let the session merge it instead of copying params per call
+        self.s.params = {"api_key": self.api_key}
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=16, pool_maxsize=16)
+        self.s.mount("https://", adapter)
+        self.s.mount("http://", adapter)
 
     def get(self, path: str, params: Optional[dict] = None) -> dict:
-        params = dict(params or {})
-        params["api_key"] = self.api_key
-        url = self.base + path
-        r = self.s.get(url, params=params, timeout=self.timeout)
+        if self.bucket is not None:
+            self.bucket.acquire()
+        r = self.s.get(self.base + path, params=params, timeout=self.timeout)
         r.raise_for_status()
-        return r.json()
+        # Parse the raw UTF-8 bytes directly (no decode to str first).
+        return _json_loads(r.content)
+
+
+def synced_seasons(full: dict, max_seasons: int, skip_specials: bool):
+    """Yield (season_number, season_dict) for the seasons we sync (1..max_seasons)."""
+    for s in full.get("seasons") or []:
+        snum = safe_int(s.get("season_number"))
+        if snum is None:
+            continue
+        if skip_specials and snum == 0:
+            continue
+        if snum <= 0:
+            continue
+        if snum > max_seasons:
+            continue
+        yield snum, s
+
+
+# Network half of the upserts: no DB access, so these run on the fetch threads.
+def fetch_movie(tmdb: TMDbClient, tmdb_id: int, language: str) -> Tuple[dict, dict]:
+    # full movie + credits/videos/keywords + external_ids (imdb_id, needed for movie_link3) in one request
+    full = tmdb.get(f"/movie/{tmdb_id}", params={"language": language, "append_to_response": "credits,videos,keywords,external_ids"})
+    ext = full.get("external_ids") or {}
+    return full, ext
+
+
+def fetch_tv(tmdb: TMDbClient, tv_id: int, language: str,
+             sync_eps: bool, max_seasons: int, skip_specials: bool) -> Tuple[dict, dict, Dict[int, dict]]:
+    # external ids come back with the show itself (append_to_response)
+    full = tmdb.get(f"/tv/{tv_id}", params={"language": language, "append_to_response": "credits,videos,keywords,external_ids"})
+    ext = full.get("external_ids") or {}
+
+    # season full for episodes (a failed season is simply missing from the dict)
+    seasons: Dict[int, dict] = {}
+    if sync_eps:
+        for snum, _ in synced_seasons(full, max_seasons, skip_specials):
+            try:
+                seasons[snum] = tmdb.get(f"/tv/{tv_id}/season/{snum}", params={"language": language})
+            except Exception:
+                continue
+    return full, ext, seasons
 
 
 class Command(BaseCommand):
@@ -218,6 +360,7 @@ class Command(BaseCommand):
         parser.add_argument("--min-votes", type=int, default=800, help="discover.vote_count.gte (filters obscure titles).")
         parser.add_argument("--language", type=str, default="en-US")
         parser.add_argument("--overwrite", action="store_true", help="Overwrite non-empty fields (default: fill only if empty).")
+        parser.add_argument("--skip-existing", action="store_true", help="Don't fetch/update titles already in DB (new releases only; ignored with --overwrite).")
         parser.add_argument("--verbose-adds", action="store_true", help="Print created/updated titles.")
         parser.add_argument("--only-created", action="store_true", help="If verbose, print only created (not updated).")        # TV episodes sync is ON by default (so new TV titles always get seasons/episodes like seed_titlesV2).
         parser.set_defaults(tv_sync_episodes=True)
@@ -226,7 +369,9 @@ class Command(BaseCommand):
         parser.add_argument("--tv-max-seasons", type=int, default=2, help="Max seasons to sync per tv show (starting at season 1).")
         parser.add_argument("--skip-specials", action="store_true", help="Skip season 0.")
 
-        parser.add_argument("--sleep", type=float, default=0.2, help="Sleep between detail calls (avoid TMDB rate spikes).")
+        parser.add_argument("--workers", type=int, default=8, help="Parallel TMDB detail fetches (DB writes stay on the main thread).")
+        parser.add_argument("--rate", type=float, default=4.0, help="Max TMDB requests/second across all workers (TMDB cap: ~40/10s).")
+        parser.add_argument("--sleep", type=float, default=None, help="Deprecated (kept for old cron lines): mapped to --rate 1/SLEEP, overrides --rate.")
 
         parser.add_argument("--check-dups", action="store_true", help="Print duplicate groups (type,tmdb_id) if any.")
         parser.add_argument("--max-print", type=int, default=200, help="Max verbose lines printed per type.")
@@ -234,10 +379,6 @@ class Command(BaseCommand):
     def _log(self, msg: str):
         self.stdout.write(msg)
 
-    def _maybe_sleep(self, sec: float):
-        if sec and sec > 0:
-            time.sleep(sec)
-
     def _check_duplicates(self):
         qs = (
             Title.objects.exclude(tmdb_id__isnull=True)
@@ -246,48 +387,76 @@ class Command(BaseCommand):
             .filter(c__gt=1)
             .order_by("-c")
         )
-        n = qs.count()
-        if n == 0:
+        # Single run of the GROUP BY: fetch one extra row to know whether there are more than 25.
+        rows = list(qs[:26])
+        if not rows:
             self._log("[dups] OK: no duplicate (type, tmdb_id) groups found.")
             return
+        n = "25+" if len(rows) > 25 else len(rows)
         self._log(f"[dups] WARNING: {n} duplicate groups found. Showing first 25:")
-        for row in qs[:25]:
+        for row in rows[:25]:
             self._log(f"  - type={row['type']} tmdb_id={row['tmdb_id']} count={row['c']}")
 
     def _sync_actors(self, title_obj: Title, full: dict):
-        # uses Actor unique constraint (title, name_norm)
+        # uses Actor unique constraint (title, name_norm): one upsert statement per title
         cast_list = (full.get("credits") or {}).get("cast", []) or []
+        actors: Dict[str, Actor] = {}
         for c in cast_list[:30]:
             name = (c.get("name") or "").strip()
             if not name:
                 continue
-            Actor.objects.update_or_create(
+            name_norm = norm(name)
+            # same name_norm twice: last one wins, like successive update_or_create calls
+            actors[name_norm] = Actor(
                 title=title_obj,
-                name_norm=norm(name),
-                defaults={
-                    "name": name,
-                    "tmdb_id": safe_int(c.get("id")),
-                    "profile_path": c.get("profile_path") or "",
-                    "character": c.get("character") or "",
-                },
+                name_norm=name_norm,
+                name=name,
+                tmdb_id=safe_int(c.get("id")),
+                profile_path=c.get("profile_path") or "",
+                character=c.get("character") or "",
             )
+        if not actors:
+            return
+        Actor.objects.bulk_create(
+            list(actors.values()),
+            update_conflicts=True,
+            # MySQL's ON DUPLICATE KEY UPDATE can't name the conflict target.
+            unique_fields=(["title", "name_norm"]
+                           if connection.features.supports_update_conflicts_with_target else None),
+            update_fields=["name", "tmdb_id", "profile_path", "character"],
+        )
 
-    @transaction.atomic
-    def _upsert_movie(self, tmdb: TMDbClient, tmdb_id: int, language: str, overwrite: bool,
-                      verbose: bool, only_created: bool, max_print: int, sleep_s: float,
-                      stats: dict):
-
-        # full movie + credits/videos/keywords
-        full = tmdb.get(f"/movie/{tmdb_id}", params={"language": language, "append_to_response": "credits,videos,keywords"})
-        self._maybe_sleep(sleep_s)
-
-        # external_ids for imdb_id (needed for movie_link3)
-        ext = {}
-        try:
-            ext = tmdb.get(f"/movie/{tmdb_id}/external_ids")
-        except Exception:
-            ext = {}
-        self._maybe_sleep(sleep_s)
+    def _upsert_title(self, type_: str, tmdb_id: int, row: dict, overwrite: bool) -> Tuple[Title, bool, bool]:
+        """
+        At most two statements per title: SELECT, then INSERT or an UPDATE of the
+        changed columns only (no get_or_create savepoint, no full-row save()).
+        Callable values in `row` are computed lazily, only for columns that can change.
+        Returns (obj, created, changed).
+        """
+        obj = Title.objects.filter(type=type_, tmdb_id=tmdb_id).first()
+        if obj is None:
+            return Title.objects.create(**{f: (v() if callable(v) else v) for f, v in row.items()}), True, False
+
+        changed_fields = []
+        for f, v in row.items():
+            if f in ("type", "tmdb_id"):
+                continue
+            if callable(v):
+                # fill-only mode would drop it anyway -> don't even build it
+                if not overwrite:
+                    curr = getattr(obj, f, None)
+                    if not (curr is None or curr == "" or curr == []):
+                        continue
+                v = v()
+            if fill_field(obj, f, v, overwrite=overwrite):
+                changed_fields.append(f)
+        if changed_fields:
+            obj.save(update_fields=changed_fields)
+        return obj, False, bool(changed_fields)
+
+    def _apply_movie(self, tmdb_id: int, full: dict, ext: dict, overwrite: bool,
+                     verbose: bool, only_created: bool, max_print: int,
+                     stats: dict):
 
         imdb_code = (ext.get("imdb_id") or None)
 
@@ -298,9 +467,9 @@ class Command(BaseCommand):
         release_date = (full.get("release_date") or "").strip()
         release_year = parse_year_from_ymd(release_date)
 
-        links = movie_title_links(tmdb_id, imdb_code)
-
-        genre_str = ", ".join([g.get("name") for g in (full.get("genres") or []) if g.get("name")])
+        # Derived fields are thunks: _upsert_title only builds the ones it will actually write.
+        links = functools.cache(lambda: movie_title_links(tmdb_id, imdb_code))
+        d = functools.cache(lambda: extract_full(full, is_tv=False))
 
         row = {
             "type": "movie",
@@ -323,45 +492,36 @@ class Command(BaseCommand):
             "vote_count": safe_int(full.get("vote_count")),
             "popularity": safe_float(full.get("popularity")),
 
-            "poster": img_url(full.get("poster_path"), "original"),
-            "landscape_image": img_url(full.get("backdrop_path"), "original"),
+            "poster": lambda: img_url(full.get("poster_path"), "original"),
+            "landscape_image": lambda: img_url(full.get("backdrop_path"), "original"),
 
-            "video_url": links["video_url"],
-            "movie_link2": links["movie_link2"],
-            "movie_link3": links["movie_link3"],
-            "movie_link4": links["movie_link4"],
-            "movie_link5": links["movie_link5"],
-            "movie_link6": links["movie_link6"],
+            "video_url": lambda: links()["video_url"],
+            "movie_link2": lambda: links()["movie_link2"],
+            "movie_link3": lambda: links()["movie_link3"],
+            "movie_link4": lambda: links()["movie_link4"],
+            "movie_link5": lambda: links()["movie_link5"],
+            "movie_link6": lambda: links()["movie_link6"],
 
-            "trailer_url": tmdb_trailer_url(full),
+            "trailer_url": lambda: d().trailer_url,
 
-            "genre": genre_str,
-            "primary_genre_norm": primary_genre_norm_from_genre_string(genre_str),
+            "genre": lambda: d().genre,
+            "primary_genre_norm": lambda: primary_genre_norm_from_genre_string(d().genre),
 
-            "keywords": tmdb_movie_keywords(full),
-            "production_companies": [{"id": c.get("id"), "name": c.get("name")} for c in (full.get("production_companies") or [])],
-            "production_countries": [c.get("name") for c in (full.get("production_countries") or []) if c.get("name")],
-            "spoken_languages": [l.get("name") for l in (full.get("spoken_languages") or []) if l.get("name")],
+            "keywords": lambda: d().keywords,
+            "production_companies": lambda: d().production_companies,
+            "production_countries": lambda: d().production_countries,
+            "spoken_languages": lambda: d().spoken_languages,
             "belongs_to_collection": full.get("belongs_to_collection"),
 
-            "director": tmdb_director_from_credits(full),
-            "cast": tmdb_cast_names(full, limit=10),
+            "director": lambda: d().director,
+            "cast": lambda: d().cast,
         }
 
-        obj, created = Title.objects.get_or_create(type="movie", tmdb_id=tmdb_id, defaults=row)
+        with transaction.atomic():
+            obj, created, changed = self._upsert_title("movie", tmdb_id, row, overwrite)
 
-        changed = False
-        if not created:
-            for f, v in row.items():
-                if f in ("type", "tmdb_id"):
-                    continue
-                if fill_field(obj, f, v, overwrite=overwrite):
-                    changed = True
-            if changed:
-                obj.save()
-
-        # also update actors table (optional but keeps your Actor list fresh)
-        self._sync_actors(obj, full)
+            # also update actors table (optional but keeps your Actor list fresh)
+            self._sync_actors(obj, full)
 
         if created:
             stats["movie"]["created"] += 1
@@ -374,22 +534,10 @@ class Command(BaseCommand):
                 self._log(f"[{tag}] movie tmdb_id={tmdb_id} year={release_year or '????'} title={title_str}")
                 stats["movie"]["printed"] += 1
 
-    @transaction.atomic
-    def _upsert_tv(self, tmdb: TMDbClient, tv_id: int, language: str, overwrite: bool,
-                   verbose: bool, only_created: bool, max_print: int, sleep_s: float,
-                   sync_eps: bool, max_seasons: int, skip_specials: bool,
-                   stats: dict):
-
-        full = tmdb.get(f"/tv/{tv_id}", params={"language": language, "append_to_response": "credits,videos,keywords"})
-        self._maybe_sleep(sleep_s)
-
-        # external ids (optional)
-        ext = {}
-        try:
-            ext = tmdb.get(f"/tv/{tv_id}/external_ids")
-        except Exception:
-            ext = {}
-        self._maybe_sleep(sleep_s)
+    def _apply_tv(self, tv_id: int, full: dict, ext: dict, seasons: Dict[int, dict], overwrite: bool,
+                  verbose: bool, only_created: bool, max_print: int,
+                  sync_eps: bool, max_seasons: int, skip_specials: bool,
+                  stats: dict):
 
         imdb_code = (ext.get("imdb_id") or None)
 
@@ -398,9 +546,9 @@ class Command(BaseCommand):
             return
 
         first_air_date = (full.get("first_air_date") or "").strip()
-        genre_str = ", ".join([g.get("name") for g in (full.get("genres") or []) if g.get("name")])
-
-        links = tv_title_links(tv_id)
+        # Derived fields are thunks: _upsert_title only builds the ones it will actually write.
+        links = functools.cache(lambda: tv_title_links(tv_id))
+        d = functools.cache(lambda: extract_full(full, is_tv=True))
 
         row = {
             "type": "tv",
@@ -412,6 +560,7 @@ class Command(BaseCommand):
             "original_language": (full.get("original_language") or "").strip(),
 
             "first_air_date": first_air_date,
+            "release_year": parse_year_from_ymd(first_air_date),  # year filters treat movies and tv alike
 
             "description": (full.get("overview") or "").strip(),
             "status": (full.get("status") or "").strip(),
@@ -421,57 +570,49 @@ class Command(BaseCommand):
             "vote_count": safe_int(full.get("vote_count")),
             "popularity": safe_float(full.get("popularity")),
 
-            "poster": img_url(full.get("poster_path"), "original"),
-            "landscape_image": img_url(full.get("backdrop_path"), "original"),
+            "poster": lambda: img_url(full.get("poster_path"), "original"),
+            "landscape_image": lambda: img_url(full.get("backdrop_path"), "original"),
 
-            "video_url": links["video_url"],
-            "movie_link2": links["movie_link2"],
-            "movie_link3": links["movie_link3"],
-            "movie_link4": links["movie_link4"],
-            "movie_link5": links["movie_link5"],
-            "movie_link6": links["movie_link6"],
+            "video_url": lambda: links()["video_url"],
+            "movie_link2": lambda: links()["movie_link2"],
+            "movie_link3": lambda: links()["movie_link3"],
+            "movie_link4": lambda: links()["movie_link4"],
+            "movie_link5": lambda: links()["movie_link5"],
+            "movie_link6": lambda: links()["movie_link6"],
 
-            "trailer_url": tmdb_trailer_url(full),
+            "trailer_url": lambda: d().trailer_url,
 
-            "genre": genre_str,
-            "primary_genre_norm": primary_genre_norm_from_genre_string(genre_str),
+            "genre": lambda: d().genre,
+            "primary_genre_norm": lambda: primary_genre_norm_from_genre_string(d().genre),
 
-            "keywords": tmdb_tv_keywords(full),
-            "production_companies": [{"id": c.get("id"), "name": c.get("name")} for c in (full.get("production_companies") or [])],
-            "production_countries": [c.get("name") for c in (full.get("production_countries") or []) if c.get("name")],
-            "spoken_languages": [l.get("name") for l in (full.get("spoken_languages") or []) if l.get("name")],
+            "keywords": lambda: d().keywords,
+            "production_companies": lambda: d().production_companies,
+            "production_countries": lambda: d().production_countries,
+            "spoken_languages": lambda: d().spoken_languages,
             "belongs_to_collection": None,
 
-            "director": "",  # TV director isn't stable like movies
-            "cast": tmdb_cast_names(full, limit=10),
+            "director": lambda: d().director,
+            "cast": lambda: d().cast,
         }
 
-        obj, created = Title.objects.get_or_create(type="tv", tmdb_id=tv_id, defaults=row)
+        # Title-level rows in one short transaction; each season gets its own below.
+        with transaction.atomic():
+            obj, created, changed = self._upsert_title("tv", tv_id, row, overwrite)
 
-        changed = False
-        if not created:
-            for f, v in row.items():
-                if f in ("type", "tmdb_id"):
-                    continue
-                if fill_field(obj, f, v, overwrite=overwrite):
-                    changed = True
-            if changed:
-                obj.save()
-
-        # TV extras
-        TVShowExtras.objects.update_or_create(
-            title=obj,
-            defaults={
-                "number_of_seasons": safe_int(full.get("number_of_seasons"), 0) or 0,
-                "number_of_episodes": safe_int(full.get("number_of_episodes"), 0) or 0,
-                "in_production": bool(full.get("in_production")),
-                "episode_run_time": full.get("episode_run_time") or [],
-                "network_names": [n.get("name") for n in (full.get("networks") or []) if n.get("name")],
-            },
-        )
+            # TV extras
+            TVShowExtras.objects.update_or_create(
+                title=obj,
+                defaults={
+                    "number_of_seasons": safe_int(full.get("number_of_seasons"), 0) or 0,
+                    "number_of_episodes": safe_int(full.get("number_of_episodes"), 0) or 0,
+                    "in_production": bool(full.get("in_production")),
+                    "episode_run_time": full.get("episode_run_time") or [],
+                    "network_names": [n.get("name") for n in (full.get("networks") or []) if n.get("name")],
+                },
+            )
 
-        # Actors
-        self._sync_actors(obj, full)
+            # Actors
+            self._sync_actors(obj, full)
 
         if created:
             stats["tv"]["created"] += 1
@@ -488,123 +629,173 @@ class Command(BaseCommand):
         if not sync_eps:
             return
 
-        seasons_list = full.get("seasons") or []
         seasons_synced = 0
 
-        for s in seasons_list:
-            snum = safe_int(s.get("season_number"))
-            if snum is None:
-                continue
-            if skip_specials and snum == 0:
-                continue
-            if snum <= 0:
-                continue
-            if snum > max_seasons:
-                continue
+        for snum, s in synced_seasons(full, max_seasons, skip_specials):
+            if self._apply_season(obj, tv_id, snum, s, seasons.get(snum), overwrite):
+                seasons_synced += 1
 
-            season_obj, _ = Season.objects.update_or_create(
-                tv=obj,
-                season_number=snum,
-                defaults={
-                    "tmdb_id": safe_int(s.get("id")),
-                    "name": s.get("name") or "",
-                    "overview": s.get("overview") or "",
-                    "air_date": s.get("air_date") or "",
-                    "poster": s.get("poster_path") or "",
-                },
-            )
+        stats["tv"]["seasons_synced"] += seasons_synced
 
-            # season full for episodes
-            try:
-                sfull = tmdb.get(f"/tv/{tv_id}/season/{snum}", params={"language": language})
-            except Exception:
+    @transaction.atomic
+    def _apply_season(self, obj: Title, tv_id: int, snum: int, s: dict, sfull: Optional[dict],
+                      overwrite: bool) -> bool:
+        """Season row + its episodes, in a transaction of their own. Returns True if episodes were synced."""
+        season_obj, _ = Season.objects.update_or_create(
+            tv=obj,
+            season_number=snum,
+            defaults={
+                "tmdb_id": safe_int(s.get("id")),
+                "name": s.get("name") or "",
+                "overview": s.get("overview") or "",
+                "air_date": s.get("air_date") or "",
+                "poster": s.get("poster_path") or "",
+            },
+        )
+
+        # season full for episodes (fetched by fetch_tv; None if that request failed)
+        if sfull is None:
+            return False
+
+        episodes = sfull.get("episodes") or []
+        # One SELECT for the season, then batched INSERT/UPDATE instead of get_or_create + save per episode.
+        existing = {ep.episode_number: ep for ep in Episode.objects.filter(season=season_obj)}
+        to_create: List[Episode] = []
+        to_update: Dict[int, Episode] = {}
+        update_fields = set()
+        for e in episodes:
+            enum = safe_int(e.get("episode_number"), 0) or 0
+            if enum <= 0:
                 continue
-            self._maybe_sleep(sleep_s)
 
-            episodes = sfull.get("episodes") or []
-            for e in episodes:
-                enum = safe_int(e.get("episode_number"), 0) or 0
-                if enum <= 0:
-                    continue
+            # provider links are only formatted for new episodes or empty columns (same thunks as Title rows)
+            links = functools.cache(functools.partial(episode_links, tv_id, snum, enum))
+
+            # Episode model fields include episode_link4/5/6 :contentReference[oaicite:6]{index=6}
+            ep_defaults = {
+                "tmdb_id": safe_int(e.get("id")),
+                "name": e.get("name") or "",
+                "overview": e.get("overview") or "",
+                "air_date": e.get("air_date") or "",
+                "still_path": e.get("still_path") or "",
+                "vote_average": safe_float(e.get("vote_average")),
+                "vote_count": safe_int(e.get("vote_count")),
+                "runtime": safe_int(e.get("runtime")),
+
+                "imdb_code": None,
+                "video_url": lambda: links()["video_url"],
+                "episode_link2": lambda: links()["episode_link2"],
+                "episode_link3": lambda: links()["episode_link3"],
+                "episode_link4": lambda: links()["episode_link4"],
+                "episode_link5": lambda: links()["episode_link5"],
+                "episode_link6": lambda: links()["episode_link6"],
+            }
+
+            ep_obj = existing.get(enum)
+            if ep_obj is None:
+                ep_obj = Episode(season=season_obj, episode_number=enum,
+                                 **{f: (v() if callable(v) else v) for f, v in ep_defaults.items()})
+                existing[enum] = ep_obj
+                to_create.append(ep_obj)
+                continue
 
-                links = episode_links(tv_id, snum, enum)
-
-                # Episode model fields include episode_link4/5/6 :contentReference[oaicite:6]{index=6}
-                ep_defaults = {
-                    "tmdb_id": safe_int(e.get("id")),
-                    "name": e.get("name") or "",
-                    "overview": e.get("overview") or "",
-                    "air_date": e.get("air_date") or "",
-                    "still_path": e.get("still_path") or "",
-                    "vote_average": safe_float(e.get("vote_average")),
-                    "vote_count": safe_int(e.get("vote_count")),
-                    "runtime": safe_int(e.get("runtime")),
-
-                    "imdb_code": None,
-                    "video_url": links["video_url"],
-                    "episode_link2": links["episode_link2"],
-                    "episode_link3": links["episode_link3"],
-                    "episode_link4": links["episode_link4"],
-                    "episode_link5": links["episode_link5"],
-                    "episode_link6": links["episode_link6"],
-                }
-
-                ep_obj, ep_created = Episode.objects.get_or_create(
-                    season=season_obj,
-                    episode_number=enum,
-                    defaults=ep_defaults,
-                )
-
-                # fill-only-if-empty (unless overwrite)
-                if not ep_created:
-                    ep_changed = False
-                    for f, v in ep_defaults.items():
-                        if fill_field(ep_obj, f, v, overwrite=overwrite):
-                            ep_changed = True
-                    if ep_changed:
-                        ep_obj.save()
-
-            seasons_synced += 1
+            # fill-only-if-empty (unless overwrite)
+            for f, v in ep_defaults.items():
+                if callable(v):
+                    if not overwrite:
+                        curr = getattr(ep_obj, f, None)
+                        if not (curr is None or curr == "" or curr == []):
+                            continue
+                    v = v()
+                if fill_field(ep_obj, f, v, overwrite=overwrite):
+                    update_fields.add(f)
+                    if ep_obj.pk is not None:
+                        to_update[enum] = ep_obj
+
+        if to_create:
+            Episode.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            Episode.objects.bulk_update(list(to_update.values()), sorted(update_fields), batch_size=500)
 
-        stats["tv"]["seasons_synced"] += seasons_synced
+        return True
 
     def handle(self, *args, **opts):
         pages = int(opts["pages"])
         min_votes = int(opts["min_votes"])
         language = str(opts["language"])
         overwrite = bool(opts["overwrite"])
+        skip_existing = bool(opts["skip_existing"]) and not overwrite
         verbose = bool(opts["verbose_adds"])
         only_created = bool(opts["only_created"])
         sync_eps = bool(opts["tv_sync_episodes"])
         max_seasons = int(opts["tv_max_seasons"])
         skip_specials = bool(opts["skip_specials"])
-        sleep_s = float(opts["sleep"])
+        workers = max(1, int(opts["workers"]))
+        rate = float(opts["rate"])
+        if opts["sleep"] is not None:
+            # --sleep S used to space sequential calls by S seconds: same average pace
+            sleep_s = float(opts["sleep"])
+            rate = 1.0 / sleep_s if sleep_s > 0 else 0.0
+            self.stdout.write(self.style.WARNING(
+                f"--sleep is deprecated, use --rate instead: running with --rate {rate:g}"
+                + (" (no limit)" if rate <= 0 else "")
+            ))
         check_dups = bool(opts["check_dups"])
         max_print = int(opts["max_print"])
 
-        tmdb = TMDbClient()
+        tmdb = TMDbClient(bucket=TokenBucket(refill=rate) if rate > 0 else None)
 
         self._log("====================================================")
         self._log("[sync_tmdb_monthly] starting…")
         self._log(f"pages={pages} min_votes={min_votes} language={language} overwrite={overwrite}")
         self._log(f"tv_sync_episodes={sync_eps} tv_max_seasons={max_seasons} skip_specials={skip_specials}")
-        self._log(f"sleep={sleep_s}s")
+        self._log(f"workers={workers} rate={rate}/s skip_existing={skip_existing}")
         self._log("====================================================")
 
         stats = {
-            "movie": {"created": 0, "updated": 0, "printed": 0},
-            "tv": {"created": 0, "updated": 0, "printed": 0, "seasons_synced": 0},
+            "movie": {"created": 0, "updated": 0, "skipped": 0, "printed": 0},
+            "tv": {"created": 0, "updated": 0, "skipped": 0, "printed": 0, "seasons_synced": 0},
         }
 
+        # One query up front: titles already in DB are skipped before any TMDB request.
+        existing = None
+        if skip_existing:
+            existing = set(Title.objects.exclude(tmdb_id__isnull=True).values_list("type", "tmdb_id"))
+            self._log(f"[existing] {len(existing)} (type, tmdb_id) pairs already in DB")
+
         # Discover params
         today = today_ymd()
 
+        # Detail fetches fan out on this pool; DB writes stay on the main thread.
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            self._sync_discovered(pool, tmdb, pages, min_votes, language, today, overwrite, verbose,
+                                  only_created, max_print, sync_eps, max_seasons, skip_specials, stats,
+                                  existing)
+        finally:
+            pool.shutdown(wait=True)
+
+        self._log("====================================================")
+        self._log("[SUMMARY]")
+        self._log(f"movies: created={stats['movie']['created']} updated={stats['movie']['updated']} skipped={stats['movie']['skipped']}")
+        self._log(f"tv: created={stats['tv']['created']} updated={stats['tv']['updated']} skipped={stats['tv']['skipped']} seasons_synced={stats['tv']['seasons_synced']}")
+        self._log("====================================================")
+
+        if check_dups:
+            self._check_duplicates()
+
+        self._log("DONE.")
+
+    def _sync_discovered(self, pool, tmdb, pages, min_votes, language, today, overwrite, verbose,
+                         only_created, max_print, sync_eps, max_seasons, skip_specials, stats,
+                         existing=None):
         # ----------------
         # Movies
         # ----------------
         self._log("[movies] discover…")
-        for page in range(1, pages + 1):
-            data = tmdb.get("/discover/movie", params={
+        self._pipeline(
+            pool, tmdb, "movie", "movies", "/discover/movie",
+            [{
                 "language": language,
                 "sort_by": "popularity.desc",
                 "include_adult": "false",
@@ -612,78 +803,92 @@ class Command(BaseCommand):
                 "page": page,
                 "vote_count.gte": min_votes,
                 "release_date.lte": today,  # only released (or at least dated) <= today
-            })
-
-            results = data.get("results") or []
-            self._log(f"[movies] page={page} results={len(results)}")
-
-            for it in results:
-                mid = safe_int(it.get("id"))
-                if not mid:
-                    continue
-                try:
-                    self._upsert_movie(
-                        tmdb=tmdb,
-                        tmdb_id=mid,
-                        language=language,
-                        overwrite=overwrite,
-                        verbose=verbose,
-                        only_created=only_created,
-                        max_print=max_print,
-                        sleep_s=sleep_s,
-                        stats=stats,
-                    )
-                except Exception as ex:
-                    self._log(f"[movies] ERROR tmdb_id={mid}: {ex}")
+            } for page in range(1, pages + 1)],
+            fetch=lambda mid: fetch_movie(tmdb, mid, language),
+            apply=lambda mid, res: self._apply_movie(
+                tmdb_id=mid,
+                full=res[0],
+                ext=res[1],
+                overwrite=overwrite,
+                verbose=verbose,
+                only_created=only_created,
+                max_print=max_print,
+                stats=stats,
+            ),
+            stats=stats,
+            existing=existing,
+        )
 
         # ----------------
         # TV
         # ----------------
         self._log("[tv] discover…")
-        for page in range(1, pages + 1):
-            data = tmdb.get("/discover/tv", params={
+        self._pipeline(
+            pool, tmdb, "tv", "tv", "/discover/tv",
+            [{
                 "language": language,
                 "sort_by": "popularity.desc",
                 "page": page,
                 "vote_count.gte": min_votes,
                 "first_air_date.lte": today,
-            })
-
-            results = data.get("results") or []
-            self._log(f"[tv] page={page} results={len(results)}")
+            } for page in range(1, pages + 1)],
+            fetch=lambda tid: fetch_tv(tmdb, tid, language, sync_eps, max_seasons, skip_specials),
+            apply=lambda tid, res: self._apply_tv(
+                tv_id=tid,
+                full=res[0],
+                ext=res[1],
+                seasons=res[2],
+                overwrite=overwrite,
+                verbose=verbose,
+                only_created=only_created,
+                max_print=max_print,
+                sync_eps=sync_eps,
+                max_seasons=max_seasons,
+                skip_specials=skip_specials,
+                stats=stats,
+            ),
+            stats=stats,
+            existing=existing,
+        )
 
-            for it in results:
-                tid = safe_int(it.get("id"))
-                if not tid:
+    def _pipeline(self, pool, tmdb, type_, label, path, page_params, fetch, apply, stats, existing=None):
+        """
+        discover pages -> detail fetches (pool) -> DB writes (main thread).
+        Every discover page is submitted up front; each page's detail fetches are queued
+        as soon as that page lands, and writes happen as soon as each detail is ready.
+        """
+        pending = {pool.submit(tmdb.get, path, params=params): ("page", params["page"])
+                   for params in page_params}
+        seen = set()  # same id can show up on two pages when popularity shifts mid-run
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind, key = pending.pop(fut)
+
+                if kind == "page":
+                    try:
+                        results = fut.result().get("results") or []
+                    except Exception as ex:
+                        self._log(f"[{label}] ERROR discover page={key}: {ex}")
+                        continue
+                    self._log(f"[{label}] page={key} results={len(results)}")
+
+                    for it in results:
+                        tmdb_id = safe_int(it.get("id"))
+                        if not tmdb_id or tmdb_id in seen:
+                            continue
+                        seen.add(tmdb_id)
+                        if existing is not None and (type_, tmdb_id) in existing:
+                            stats[type_]["skipped"] += 1
+                            continue
+                        pending[pool.submit(fetch, tmdb_id)] = ("detail", tmdb_id)
                     continue
+
                 try:
-                    self._upsert_tv(
-                        tmdb=tmdb,
-                        tv_id=tid,
-                        language=language,
-                        overwrite=overwrite,
-                        verbose=verbose,
-                        only_created=only_created,
-                        max_print=max_print,
-                        sleep_s=sleep_s,
-                        sync_eps=sync_eps,
-                        max_seasons=max_seasons,
-                        skip_specials=skip_specials,
-                        stats=stats,
-                    )
+                    apply(key, fut.result())
                 except Exception as ex:
-                    self._log(f"[tv] ERROR tmdb_id={tid}: {ex}")
-
-        self._log("====================================================")
-        self._log("[SUMMARY]")
-        self._log(f"movies: created={stats['movie']['created']} updated={stats['movie']['updated']}")
-        self._log(f"tv: created={stats['tv']['created']} updated={stats['tv']['updated']} seasons_synced={stats['tv']['seasons_synced']}")
-        self._log("====================================================")
-
-        if check_dups:
-            self._check_duplicates()
-
-        self._log("DONE.")
+                    self._log(f"[{label}] ERROR tmdb_id={key}: {ex}")
 
 """
 ====================================================
@@ -705,7 +910,8 @@ EXEMPLES (les plus utiles)
 1) NOUVELLES SORTIES (Films + Séries) — recommandé
    - Ajoute uniquement les nouveaux Titles (movie/tv) manquants dans ta DB
    - Affiche uniquement les créations ([CREATE])
-python manage.py sync_tmdb_monthly --pages 10 --min-votes 800 --verbose-adds --only-created
+   - --skip-existing: les titres déjà en DB ne sont même pas re-téléchargés (beaucoup plus rapide)
+python manage.py sync_tmdb_monthly --pages 10 --min-votes 800 --verbose-adds --only-created --skip-existing
 
 2) NOUVELLES SORTIES + épisodes (TV)
    - Ajoute les nouveaux Titles TV + récupère saisons/épisodes (limité aux saisons 1..2)
@@ -721,7 +927,7 @@ python manage.py sync_tmdb_monthly --pages 10 --min-votes 2000 --verbose-adds --
 python manage.py sync_tmdb_monthly --pages 10 --min-votes 500 --verbose-adds --only-created
 
 5) Si tu te fais rate-limit (TMDb 429), ralentis un peu:
-python manage.py sync_tmdb_monthly --pages 10 --min-votes 800 --sleep 0.35 --verbose-adds --only-created
+python manage.py sync_tmdb_monthly --pages 10 --min-votes 800 --rate 2 --verbose-adds --only-created
 
 COMMENT LIRE LES LOGS
 - [CREATE] ...  => un nouveau titre a été ajouté (c’est ce que tu veux pour "nouvelles sorties")
@@ -732,6 +938,7 @@ OPTIONS IMPORTANTES
 - --pages N        : combien de pages TMDb à scanner (plus grand = plus de chances de trouver des nouveautés)
 - --min-votes X    : filtre anti-"films obscurs" (vote_count minimum)
 - --tv-sync-episodes / --tv-max-seasons : pour remplir Season/Episode
+- --skip-existing  : ignore les titres déjà en DB (pas de complétion des champs vides, pas de nouvelles saisons)
 - --overwrite      : DANGEREUX (remplace aussi les champs déjà remplis). Par défaut le script remplit seulement les champs vides.
 ====================================================
 """
@@ -765,5 +972,5 @@ OPTIONS IMPORTANTES
 # ------------------------------------------------------------
 # Si tu te fais rate-limit TMDb (429), ralentis un peu
 # ------------------------------------------------------------
-# python manage.py sync_tmdb_monthly --pages 10 --min-votes 800 --sleep 0.35 --verbose-adds --only-created
+# python manage.py sync_tmdb_monthly --pages 10 --min-votes 800 --rate 2 --verbose-adds --only-created
 #
@@ -1,6 +1,6 @@
 # users/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpResponseForbidden
-from django.utils.deprecation import MiddlewareMixin
 
 ADMIN_PREFIX = "/super-admin-7b0e/"  # keep trailing slash
 
@@ -16,23 +16,44 @@ ADMIN_ALLOWLIST = (
     "/favicon.ico",
 )
 
-class AdminBlockMiddleware(MiddlewareMixin):
-    def process_request(self, request):
-        path = request.path
+def _admin_allowed(path, user):
+    if user and user.is_authenticated and user.is_staff:
+        # Staff is fine everywhere
+        return True
 
-        # Not an admin path? Let it through.
-        if not path.startswith(ADMIN_PREFIX):
-            return None
+    # Non-staff/anonymous: allow only the allowlist (login, logout, static, etc.)
+    # str.startswith(tuple) checks every prefix in one C call
+    return path.startswith(ADMIN_ALLOWLIST)
+
+
+class AdminBlockMiddleware:
+    # Sync and async natively: under ASGI no sync_to_async thread hop per request
+    # (MiddlewareMixin runs process_request through sync_to_async).
+    sync_capable = True
+    async_capable = True
 
-        user = getattr(request, "user", None)
-        if user and user.is_authenticated and user.is_staff:
-            # Staff is fine everywhere
-            return None
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
-        # Non-staff/anonymous: allow only the allowlist (login, logout, static, etc.)
-        for allowed in ADMIN_ALLOWLIST:
-            if path.startswith(allowed):
-                return None
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
 
-        # Everything else: block
-        return HttpResponseForbidden("Forbidden")
+        path = request.path
+        # Not an admin path? Let it through.
+        if path.startswith(ADMIN_PREFIX) and not _admin_allowed(path, getattr(request, "user", None)):
+            # Everything else: block
+            return HttpResponseForbidden("Forbidden")
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        path = request.path
+        if path.startswith(ADMIN_PREFIX):
+            # request.user is lazy + sync (session/DB): use the async accessor here
+            auser = getattr(request, "auser", None)
+            user = await auser() if auser else None
+            if not _admin_allowed(path, user):
+                return HttpResponseForbidden("Forbidden")
+        return await self.get_response(request)
@@ -0,0 +1,24 @@
+# Generated by Django 5.1 on 2026-10-16 03:06
+
+import django.db.models.functions.text
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_title_primary_genre_norm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='name_fold',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Trim(users.models.RegexpReplace(django.db.models.functions.text.Lower('name_norm'), models.Value('[^[:alnum:]]+'), models.Value(' '))), output_field=models.CharField(max_length=255)),
+        ),
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['title', 'name_fold'], name='users_actor_title_i_ce85f9_idx'),
+        ),
+    ]
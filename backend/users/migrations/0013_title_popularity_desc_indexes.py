@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-16 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_actor_name_fold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-popularity', '-vote_average', 'id'], name='idx_title_pop_vote_desc'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['original_language', '-popularity', '-vote_average'], name='idx_title_lang_pop_desc'),
+        ),
+    ]
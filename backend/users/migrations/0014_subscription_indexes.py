@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-16 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_title_popularity_desc_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user', '-start_date', '-id'], name='idx_sub_user_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user', 'status', '-start_date'], name='idx_sub_user_status'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-16 03:22
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_subscription_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='first_air_date_d',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(first_air_date__regex='^[0-9]{4}-((0[13578]|1[02])-(0[1-9]|[12][0-9]|3[01])|(0[469]|11)-(0[1-9]|[12][0-9]|30)|02-(0[1-9]|1[0-9]|2[0-9]))$', then=django.db.models.functions.comparison.Cast('first_air_date', models.DateField())), default=None, output_field=models.DateField()), output_field=models.DateField()),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='release_date_d',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(release_date__regex='^[0-9]{4}-((0[13578]|1[02])-(0[1-9]|[12][0-9]|3[01])|(0[469]|11)-(0[1-9]|[12][0-9]|30)|02-(0[1-9]|1[0-9]|2[0-9]))$', then=django.db.models.functions.comparison.Cast('release_date', models.DateField())), default=None, output_field=models.DateField()), output_field=models.DateField()),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['type', '-release_date_d'], name='idx_title_type_release_d'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['type', '-first_air_date_d'], name='idx_title_type_firstair_d'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1 on 2026-10-16 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_title_date_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='titlecompany',
+            name='users_title_title_i_905123_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='titlecountry',
+            name='users_title_title_i_762b44_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='titlekeyword',
+            name='users_title_title_i_d42e41_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='titlenetwork',
+            name='users_title_title_i_185674_idx',
+        ),
+        migrations.AlterField(
+            model_name='titlecompany',
+            name='company_norm',
+            field=models.CharField(max_length=160),
+        ),
+        migrations.AlterField(
+            model_name='titlecountry',
+            name='country_code',
+            field=models.CharField(max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='titlekeyword',
+            name='keyword_norm',
+            field=models.CharField(max_length=120),
+        ),
+        migrations.AlterField(
+            model_name='titlenetwork',
+            name='network_norm',
+            field=models.CharField(max_length=160),
+        ),
+    ]
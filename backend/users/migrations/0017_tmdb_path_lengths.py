@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-16 03:24
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def check_path_lengths(apps, schema_editor):
+    # Outside strict SQL mode MySQL would silently truncate longer values on ALTER:
+    # refuse instead, with a few offending rows to look at.
+    problems = []
+    for model_name, field in (("Season", "poster"), ("Episode", "still_path")):
+        Model = apps.get_model("users", model_name)
+        qs = Model.objects.annotate(path_len=Length(field)).filter(path_len__gt=64)
+        n = qs.count()
+        if n:
+            sample = ", ".join(f"id={pk} ({ln} chars)" for pk, ln in qs.values_list("id", "path_len")[:5])
+            problems.append(f"{model_name}.{field}: {n} rows longer than 64 chars, e.g. {sample}")
+    if problems:
+        raise RuntimeError(
+            "Cannot shrink TMDb image paths to 64 chars; fix or clear these rows first:\n  "
+            + "\n  ".join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_drop_redundant_side_table_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_path_lengths, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='episode',
+            name='still_path',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='season',
+            name='poster',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-16 03:25
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Substr
+
+
+def backfill_release_year(apps, schema_editor):
+    Title = apps.get_model("users", "Title")
+    # movies: release_date, tv: first_air_date (yyyy-mm-dd strings)
+    for src in ("release_date", "first_air_date"):
+        Title.objects.filter(release_year__isnull=True, **{f"{src}__regex": r"^[0-9]{4}"}).update(
+            release_year=Cast(Substr(src, 1, 4), models.IntegerField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_tmdb_path_lengths'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_release_year, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['release_year'], name='idx_title_release_year'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-16 09:10
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    # Two accounts differing only by case would collide on the unique index once lowercased:
+    # stop with the list instead of failing halfway through the UPDATE.
+    clashes = list(
+        User.objects.annotate(email_l=Lower("email"))
+        .values("email_l")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("email_l", flat=True)
+    )
+    if clashes:
+        raise RuntimeError(
+            "Cannot lowercase User.email: these addresses exist in several letter cases, "
+            f"merge or rename them first: {', '.join(sorted(clashes))}"
+        )
+    # User.save() lowercases from now on; bring existing rows in line. Unconditional on
+    # purpose: under MySQL's *_ci collation `email = LOWER(email)` is always true, so a
+    # filter on it would select nothing.
+    User.objects.update(email=Lower("email"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_title_release_year_backfill'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-16 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0019_user_email_lowercase'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['genre'], name='idx_title_genre'),
+        ),
+    ]
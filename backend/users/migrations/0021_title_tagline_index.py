@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-16 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_title_genre_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['tagline'], name='idx_title_tagline'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-16 03:28
+
+from django.db import migrations, models
+
+
+def cancel_duplicate_active(apps, schema_editor):
+    Subscription = apps.get_model("users", "Subscription")
+    # keep the newest Active sub per (user, plan_type) so the unique index can be built
+    newest = {}
+    dupes = []
+    for sid, uid, plan in (
+        Subscription.objects.filter(status="Active")
+        .order_by("-start_date", "-id")
+        .values_list("id", "user_id", "plan_type")
+        .iterator()
+    ):
+        if (uid, plan) in newest:
+            dupes.append(sid)
+        else:
+            newest[(uid, plan)] = sid
+    if dupes:
+        Subscription.objects.filter(id__in=dupes).update(status="Canceled")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0021_title_tagline_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_active, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='subscription',
+            name='active_plan_type',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(status='Active', then=models.F('plan_type')), default=None), output_field=models.CharField(max_length=50, null=True)),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('user', 'active_plan_type'), name='uniq_active_sub_per_type'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-16 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0022_subscription_one_active_per_type'),
+    ]
+
+    operations = [
+        # new index first: tmdb_id lookups are never left unindexed
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['tmdb_id', 'title'], name='idx_actor_tmdb_title'),
+        ),
+        migrations.RemoveIndex(
+            model_name='actor',
+            name='users_actor_tmdb_id_c8f4ae_idx',
+        ),
+        migrations.AlterField(
+            model_name='actor',
+            name='tmdb_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
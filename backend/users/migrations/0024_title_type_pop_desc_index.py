@@ -0,0 +1,22 @@
+# Generated by Django 5.1 on 2026-10-16 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0023_actor_tmdb_title_index'),
+    ]
+
+    operations = [
+        # build the DESC index before dropping the ascending one
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['type', '-popularity', '-vote_average', '-id'], name='idx_title_type_pop_desc'),
+        ),
+        migrations.RemoveIndex(
+            model_name='title',
+            name='users_title_type_a67505_idx',
+        ),
+    ]
@@ -1,8 +1,32 @@
 from django.db import models
+from django.db.models.functions import Cast, Lower, Trim
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 import uuid
 
 
+class RegexpReplace(models.Func):
+    """REGEXP_REPLACE(expr, pattern, replacement) (MySQL 8 / PostgreSQL)."""
+    function = "REGEXP_REPLACE"
+    output_field = models.CharField()
+
+
+# yyyy-mm-dd with a real month and a day that exists in that month (29 allowed in any February).
+YMD_DATE_RE = r"^[0-9]{4}-((0[13578]|1[02])-(0[1-9]|[12][0-9]|3[01])|(0[469]|11)-(0[1-9]|[12][0-9]|30)|02-(0[1-9]|1[0-9]|2[0-9]))$"
+
+
+def ymd_to_date(field):
+    """
+    DATE from a 'yyyy-mm-dd' CharField; NULL for '' or anything malformed (2020-00-00, 2019-13-45,
+    2021-04-31...). Leap years are not checked: 2019-02-29 still reaches the CAST, which MySQL
+    strict mode rejects on write.
+    """
+    return models.Case(
+        models.When(**{f"{field}__regex": YMD_DATE_RE}, then=Cast(field, models.DateField())),
+        default=None,
+        output_field=models.DateField(),
+    )
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, name, password=None, **extra_fields):
         if not email:
@@ -40,6 +64,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name']  # Fields required when using createsuperuser
 
+    def save(self, *args, **kwargs):
+        # Stored lowercase so lookups are plain `email=` hits on the unique index.
+        if self.email:
+            self.email = self.email.lower()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
@@ -51,6 +81,23 @@ class Subscription(models.Model):
     renewal_date = models.DateTimeField(null=True, blank=True)  # Allow null values
     status = models.CharField(max_length=50)
     is_trial = models.BooleanField(default=False)
+    # plan_type while Active, NULL otherwise: MySQL has no partial unique index, but a
+    # unique index ignores NULLs, so (user, active_plan_type) = one Active sub per plan type
+    active_plan_type = models.GeneratedField(
+        expression=models.Case(models.When(status="Active", then=models.F("plan_type")), default=None),
+        output_field=models.CharField(max_length=50, null=True),
+        db_persist=True,
+    )
+
+    class Meta:
+        # UserSerializer.get_subscription: newest Active, else newest
+        indexes = [
+            models.Index(fields=["user", "-start_date", "-id"], name="idx_sub_user_recent"),
+            models.Index(fields=["user", "status", "-start_date"], name="idx_sub_user_status"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "active_plan_type"], name="uniq_active_sub_per_type"),
+        ]
 
 class Profile(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -94,6 +141,13 @@ class Title(models.Model):
     release_date = models.CharField(max_length=10, blank=True, default="")  # movie (yyyy-mm-dd)
     release_year = models.IntegerField(null=True, blank=True)               # convenience
     first_air_date = models.CharField(max_length=10, blank=True, default="")# tv (yyyy-mm-dd)
+    # real DATE copies maintained by the DB (writers keep the strings): indexable, range-filterable
+    release_date_d = models.GeneratedField(
+        expression=ymd_to_date("release_date"), output_field=models.DateField(), db_persist=True,
+    )
+    first_air_date_d = models.GeneratedField(
+        expression=ymd_to_date("first_air_date"), output_field=models.DateField(), db_persist=True,
+    )
 
     # durations
     runtime_minutes = models.IntegerField(null=True, blank=True)            # movie; tv episodes have runtime on Episode
@@ -145,10 +199,25 @@ class Title(models.Model):
             models.UniqueConstraint(fields=["type", "tmdb_id"], name="uniq_title_type_tmdbid"),
         ]
         indexes = [
-            models.Index(fields=["type", "popularity", "vote_average", "id"]),
+            # list/search/titles_by_actor: [type =] ORDER BY -popularity, -vote_average, -id LIMIT N,
+            # declared DESC like the untyped one below (forward scan, no backward index read)
+            models.Index(fields=["type", "-popularity", "-vote_average", "-id"], name="idx_title_type_pop_desc"),
+            # untyped "popular" seeds: ORDER BY -popularity, -vote_average LIMIT N, global and per language
+            models.Index(fields=["-popularity", "-vote_average", "id"], name="idx_title_pop_vote_desc"),
+            models.Index(fields=["original_language", "-popularity", "-vote_average"], name="idx_title_lang_pop_desc"),
             models.Index(fields=["type", "release_year"]),
+            models.Index(fields=["release_year"], name="idx_title_release_year"),  # yearMin/yearMax without type
+            # genre filter: DISTINCT genre is a loose index scan, then genre IN (...) a range probe
+            models.Index(fields=["genre"], name="idx_title_genre"),
+            models.Index(fields=["type", "-release_date_d"], name="idx_title_type_release_d"),
+            models.Index(fields=["type", "-first_air_date_d"], name="idx_title_type_firstair_d"),
+            # kept on MySQL: search/filters use istartswith = LIKE 'q%' under a *_ci collation,
+            # which these B-trees serve as a range scan (pg_trgm/GIN has no MySQL equivalent)
             models.Index(fields=["title"]),
             models.Index(fields=["original_title"]),
+            # the list filter ORs title/original_title/tagline prefixes: MySQL can only
+            # index-merge the OR when all three columns have an index
+            models.Index(fields=["tagline"], name="idx_title_tagline"),
         ]
 
     def __str__(self):
@@ -175,7 +244,7 @@ class Season(models.Model):
     name = models.CharField(max_length=200, blank=True, default="")
     overview = models.TextField(blank=True, default="")
     air_date = models.CharField(max_length=10, blank=True, default="")
-    poster = models.CharField(max_length=300, blank=True, default="")
+    poster = models.CharField(max_length=64, blank=True, default="")  # TMDB file path ("/<27 chars>.jpg"), not a URL
 
     class Meta:
         unique_together = [("tv", "season_number")]
@@ -192,7 +261,7 @@ class Episode(models.Model):
     name = models.CharField(max_length=300, blank=True, default="")
     overview = models.TextField(blank=True, default="")
     air_date = models.CharField(max_length=10, blank=True, default="")
-    still_path = models.CharField(max_length=300, blank=True, default="")
+    still_path = models.CharField(max_length=64, blank=True, default="")  # TMDB file path, not a URL
     vote_average = models.FloatField(null=True, blank=True)
     vote_count = models.IntegerField(null=True, blank=True)
     runtime = models.IntegerField(null=True, blank=True)
@@ -217,8 +286,15 @@ class Actor(models.Model):
 
     name = models.CharField(max_length=255)
     name_norm = models.CharField(max_length=255, db_index=True)
-
-    tmdb_id = models.IntegerField(null=True, blank=True, db_index=True)
+    # fold of name_norm maintained by the DB on write (lower, non-alnum -> space, trimmed);
+    # accents are folded at comparison time by the column's *_ai_ci collation.
+    name_fold = models.GeneratedField(
+        expression=Trim(RegexpReplace(Lower("name_norm"), models.Value("[^[:alnum:]]+"), models.Value(" "))),
+        output_field=models.CharField(max_length=255),
+        db_persist=True,
+    )
+
+    tmdb_id = models.IntegerField(null=True, blank=True)
     profile_path = models.CharField(max_length=255, null=True, blank=True)
 
     character = models.CharField(max_length=255, blank=True, default="")
@@ -226,8 +302,10 @@ class Actor(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["name_norm"]),
-            models.Index(fields=["tmdb_id"]),
+            # titles_by_actor: tmdb_id -> title_id straight from the index (covers tmdb_id alone too)
+            models.Index(fields=["tmdb_id", "title"], name="idx_actor_tmdb_title"),
             models.Index(fields=["title", "name_norm"]),
+            models.Index(fields=["title", "name_fold"]),
         ]
         constraints = [
         models.UniqueConstraint(fields=["title", "name_norm"], name="uniq_actor_per_title"),
@@ -240,15 +318,15 @@ class Actor(models.Model):
 
 class TitleKeyword(models.Model):
     title = models.ForeignKey(Title, on_delete=models.CASCADE, related_name="keywords_rel")
-    keyword_norm = models.CharField(max_length=120, db_index=True)
+    keyword_norm = models.CharField(max_length=120)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["title", "keyword_norm"], name="uniq_title_keyword"),
         ]
         indexes = [
+            # (title, ...) is the unique constraint's index, (keyword_norm, ...) covers keyword_norm alone
             models.Index(fields=["keyword_norm", "title"]),
-            models.Index(fields=["title"]),
         ]
 
     def __str__(self):
@@ -257,15 +335,15 @@ class TitleKeyword(models.Model):
 
 class TitleCompany(models.Model):
     title = models.ForeignKey(Title, on_delete=models.CASCADE, related_name="companies_rel")
-    company_norm = models.CharField(max_length=160, db_index=True)
+    company_norm = models.CharField(max_length=160)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["title", "company_norm"], name="uniq_title_company"),
         ]
         indexes = [
+            # (title, ...) is the unique constraint's index, (company_norm, ...) covers company_norm alone
             models.Index(fields=["company_norm", "title"]),
-            models.Index(fields=["title"]),
         ]
 
     def __str__(self):
@@ -275,15 +353,15 @@ class TitleCompany(models.Model):
 class TitleCountry(models.Model):
     title = models.ForeignKey(Title, on_delete=models.CASCADE, related_name="countries_rel")
     # si tu peux: ISO2 "US", "CA"... sinon remplace par country_norm max_length=80
-    country_code = models.CharField(max_length=2, db_index=True)
+    country_code = models.CharField(max_length=2)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["title", "country_code"], name="uniq_title_country"),
         ]
         indexes = [
+            # (title, ...) is the unique constraint's index, (country_code, ...) covers country_code alone
             models.Index(fields=["country_code", "title"]),
-            models.Index(fields=["title"]),
         ]
 
     def __str__(self):
@@ -293,15 +371,15 @@ class TitleCountry(models.Model):
 class TitleNetwork(models.Model):
     # tes networks sont dans TVShowExtras.network_names (JSONField) :contentReference[oaicite:1]{index=1}
     title = models.ForeignKey(Title, on_delete=models.CASCADE, related_name="networks_rel")
-    network_norm = models.CharField(max_length=160, db_index=True)
+    network_norm = models.CharField(max_length=160)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["title", "network_norm"], name="uniq_title_network"),
         ]
         indexes = [
+            # (title, ...) is the unique constraint's index, (network_norm, ...) covers network_norm alone
             models.Index(fields=["network_norm", "title"]),
-            models.Index(fields=["title"]),
         ]
 
     def __str__(self):
@@ -1,6 +1,37 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = "page_size"   # <-- pour ?page_size=50
     max_page_size = 200
+
+
+COUNT_CACHE_TTL = 60
+
+
+class CachedCountPaginator(Paginator):
+    """COUNT(*) mis en cache (clé = SQL de la requête): une page de catalogue n'a pas besoin d'un total exact à la seconde."""
+
+    @cached_property
+    def count(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            # filtre qui ne peut rien matcher (ex. IN ()): pas de SQL, pas de clé
+            return Paginator.count.func(self)
+        key = "pagecount:" + hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+        return cache.get_or_set(key, lambda: Paginator.count.func(self), COUNT_CACHE_TTL)
+
+
+class CachedCountPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
+
+
+class CachedCountResultsSetPagination(StandardResultsSetPagination):
+    django_paginator_class = CachedCountPaginator
@@ -1,5 +1,4 @@
 from rest_framework import serializers
-from django.db import models
 from .models import User, Subscription, Profile, PaymentHistory, Title, TVShowExtras, Season, Episode, Actor
 
 class UserSerializer(serializers.ModelSerializer):
@@ -7,18 +6,15 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_subscription(self, obj):
         # newest active first
-        qs = (Subscription.objects
-            .filter(user=obj)
-            .order_by(
-                models.Case(
-                    models.When(status='Active', then=0),  # Active first
-                    default=1,
-                    output_field=models.IntegerField()
-                ),
-                '-start_date',
-                '-id',            # tie-breaker
-            ))
-        sub = qs.first()
+        subs = getattr(obj, "prefetched_subscriptions", None)
+        if subs is not None:
+            # prefetched by the view, already ordered -start_date, -id -> no query per user
+            sub = next((s for s in subs if s.status == 'Active'), subs[0] if subs else None)
+            return SubscriptionSerializer(sub).data if sub else None
+
+        # two index range reads (idx_sub_user_status, idx_sub_user_recent) instead of a CASE sort
+        qs = Subscription.objects.filter(user=obj).order_by('-start_date', '-id')  # id = tie-breaker
+        sub = qs.filter(status='Active').first() or qs.first()
         return SubscriptionSerializer(sub).data if sub else None
 
 
@@ -29,7 +25,7 @@ class UserSerializer(serializers.ModelSerializer):
 class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
-        fields = '__all__'
+        exclude = ("active_plan_type",)
 
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -63,6 +59,9 @@ class TVExtrasSerializer(serializers.ModelSerializer):
         fields = ("number_of_seasons", "number_of_episodes", "in_production", "episode_run_time", "network_names")
 
 
+TMDB_PHOTO_PREFIX = "https://image.tmdb.org/t/p/w185"
+
+
 class ActorSerializer(serializers.ModelSerializer):
     photo = serializers.SerializerMethodField()
 
@@ -71,9 +70,8 @@ class ActorSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "tmdb_id", "profile_path", "photo", "character"]
 
     def get_photo(self, obj):
-        if not obj.profile_path:
-            return None
-        return f"https://image.tmdb.org/t/p/w185{obj.profile_path}"
+        path = obj.profile_path
+        return TMDB_PHOTO_PREFIX + path if path else None
     
     
 class TitleSerializer(serializers.ModelSerializer):
@@ -83,7 +81,7 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = "__all__"
+        exclude = ("release_date_d", "first_air_date_d")  # DB-generated sort keys, not API fields
         
 class TitleListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,19 +1,26 @@
 # users/signals.py
-from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
 
-from users.models import Profile, Title
+from users.authentication import jwt_user_cache_key
+from users.models import Profile, Title, User
 from reco.models import RecoHomeSnapshot
 
 SEED_LIMIT = 30
+SEED_IDS_CACHE_KEY = "seed:popular_ids:v1"
+SEED_IDS_TTL = 600  # identique pour tous les profils: 1 requête / 10 min au lieu d'1 par profil
 
 def build_global_seed_payload():
-    ids = list(
-        Title.objects
-        .order_by("-popularity", "-vote_average")
-        .values_list("id", flat=True)[:SEED_LIMIT]
+    ids = cache.get_or_set(
+        SEED_IDS_CACHE_KEY,
+        lambda: list(
+            Title.objects
+            .order_by("-popularity", "-vote_average")
+            .values_list("id", flat=True)[:SEED_LIMIT]
+        ),
+        timeout=SEED_IDS_TTL,
     )
 
     return {
@@ -27,24 +34,30 @@ def build_global_seed_payload():
         ],
     }
 
-@receiver(post_save, sender=Profile)
+# dispatch_uid: a second import of this module (other path, reload) cannot double-register
+@receiver(post_save, sender=Profile, dispatch_uid="users.seed_profile_on_create")
 def seed_profile_on_create(sender, instance: Profile, created, **kwargs):
     if not created:
         return
 
-    payload = build_global_seed_payload()
-    now = timezone.now()
-
-    RecoHomeSnapshot.objects.update_or_create(
-        profile_id=instance.id,
-        algo_version="home_v1_seed",
-        defaults={
-            "payload": payload,
-            "expires_at": now + timedelta(days=3650),
-            "last_error": "",
-        },
-    )
+    # Plus de copie du seed par profil: RecoHomeView sert le seed global (cache)
+    # tant que le profil n'a pas de snapshot. Ici on s'assure juste qu'il est chaud,
+    # hors du thread de requête.
+    if cache.get(SEED_IDS_CACHE_KEY) is None:
+        from users.tasks import warm_global_seed_task
+        transaction.on_commit(warm_global_seed_task)
+
+@receiver(post_save, sender=Title, dispatch_uid="users.invalidate_seed_ids.save")
+@receiver(post_delete, sender=Title, dispatch_uid="users.invalidate_seed_ids.delete")
+def invalidate_seed_ids(sender, **kwargs):
+    cache.delete(SEED_IDS_CACHE_KEY)
 
-@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=Profile, dispatch_uid="users.cleanup_profile_snapshots")
 def cleanup_profile_snapshots(sender, instance: Profile, **kwargs):
     RecoHomeSnapshot.objects.filter(profile_id=instance.id).delete()
+
+@receiver(post_save, sender=User, dispatch_uid="users.invalidate_jwt_user.save")
+@receiver(post_delete, sender=User, dispatch_uid="users.invalidate_jwt_user.delete")
+def invalidate_jwt_user(sender, instance, **kwargs):
+    # is_active / is_staff / email changes must reach CachedJWTAuthentication
+    cache.delete(jwt_user_cache_key(instance.pk))
@@ -0,0 +1,80 @@
+# users/tasks.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+# Pas de Celery dans ce projet: un petit pool in-process suffit pour ces tâches
+# courtes (quelques requêtes DB) qui ne doivent pas bloquer la requête HTTP.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="users-tasks")
+
+
+def _warm_global_seed():
+    from users.signals import build_global_seed_payload
+
+    try:
+        build_global_seed_payload()  # remplit le cache des ids
+    except Exception:
+        logger.exception("[seed] global seed warm-up FAILED")
+    finally:
+        # thread hors requête: Django ne ferme pas cette connexion tout seul
+        connection.close()
+
+
+def warm_global_seed_task():
+    return _executor.submit(_warm_global_seed)
+
+
+def _seed_profile_snapshot(profile_id):
+    from reco.views import upsert_seed_snapshot
+    from users.models import Profile
+
+    try:
+        profile = Profile.objects.get(id=profile_id)
+        upsert_seed_snapshot(profile, hours=24 * 365 * 10)
+        logger.info("[seed] snapshot created for profile_id=%s", profile_id)
+    except Exception:
+        logger.exception("[seed] FAILED for profile_id=%s", profile_id)
+    finally:
+        connection.close()
+
+
+def seed_profile_snapshot_task(profile_id):
+    return _executor.submit(_seed_profile_snapshot, profile_id)
+
+
+EMAIL_MAX_RETRIES = 5
+
+
+def _send_templated_email(subject, to, template, context):
+    html_message = render_to_string(template, context)
+    plain_message = strip_tags(html_message)
+    for attempt in range(EMAIL_MAX_RETRIES + 1):
+        try:
+            send_mail(
+                subject,
+                plain_message,
+                settings.DEFAULT_FROM_EMAIL,
+                to,
+                html_message=html_message,
+                fail_silently=False,
+            )
+            return
+        except (SMTPException, OSError):
+            if attempt == EMAIL_MAX_RETRIES:
+                logger.exception("[mail] %r to %s FAILED after %d attempts", subject, to, attempt + 1)
+                return
+            time.sleep(2 ** attempt)  # backoff: 1s, 2s, 4s...
+
+
+def send_templated_email(subject, to, template, context):
+    """Rend le template et envoie le mail hors requête (SMTP peut prendre des secondes)."""
+    return _executor.submit(_send_templated_email, subject, to, template, context)
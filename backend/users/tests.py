@@ -1,3 +1,63 @@
 from django.test import TestCase
+from rest_framework.test import APIClient, APIRequestFactory
 
-# Create your tests here.
+from .models import Actor, Episode, Season, Title, TVShowExtras
+from .views import MovieDetail
+
+
+class TitleDetailQueryCountTests(TestCase):
+    """title_detail_queryset(): the detail endpoints cost the same number of queries whatever the show's size."""
+
+    def add_seasons(self, tv, seasons, episodes):
+        start = tv.seasons.count() + 1
+        for snum in range(start, start + seasons):
+            season = Season.objects.create(tv=tv, season_number=snum)
+            Episode.objects.bulk_create(
+                Episode(season=season, episode_number=n) for n in range(1, episodes + 1)
+            )
+
+    def add_actors(self, title, n):
+        start = title.actors.count()
+        Actor.objects.bulk_create(
+            Actor(title=title, name=f"Actor {i}", name_norm=f"actor {i}") for i in range(start, start + n)
+        )
+
+    def test_title_retrieve(self):
+        tv = Title.objects.create(type="tv", title="Show", tmdb_id=1)
+        TVShowExtras.objects.create(title=tv, number_of_seasons=2, number_of_episodes=10)
+        self.add_seasons(tv, 2, 5)
+        self.add_actors(tv, 3)
+        client = APIClient()
+        url = f"/api/titles/{tv.pk}/"
+
+        # title + tv_extras (JOIN), seasons, episodes, actors
+        with self.assertNumQueries(4):
+            resp = client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["seasons"]), 2)
+        self.assertEqual(len(resp.data["seasons"][0]["episodes"]), 5)
+        self.assertEqual(resp.data["tv_extras"]["number_of_episodes"], 10)
+
+        self.add_seasons(tv, 3, 8)
+        self.add_actors(tv, 10)
+        with self.assertNumQueries(4):
+            resp = client.get(url)
+        self.assertEqual(len(resp.data["seasons"]), 5)
+        self.assertEqual(len(resp.data["actors"]), 13)
+
+    def test_movie_detail(self):
+        movie = Title.objects.create(type="movie", title="Film", tmdb_id=2)
+        self.add_actors(movie, 3)
+        view = MovieDetail.as_view()
+        factory = APIRequestFactory()
+
+        # title (+ LEFT JOIN tv_extras), seasons, actors; no seasons -> no episodes query
+        with self.assertNumQueries(3):
+            resp = view(factory.get(f"/movies/{movie.pk}/"), pk=movie.pk)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["actors"]), 3)
+
+        self.add_actors(movie, 20)
+        with self.assertNumQueries(3):
+            resp = view(factory.get(f"/movies/{movie.pk}/"), pk=movie.pk)
+        self.assertEqual(len(resp.data["actors"]), 23)
@@ -2,14 +2,16 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework import viewsets, status
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
+import hashlib
 import re
+from functools import lru_cache
 from django.db.models import Q
-from django.db import models
-from django.db.models import Q
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import Prefetch, Q
 from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.hashers import make_password, check_password
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -18,17 +20,12 @@ from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from datetime import timedelta
 from rest_framework.permissions import SAFE_METHODS, BasePermission, AllowAny, IsAuthenticated
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
 from django.utils import timezone
 from urllib.parse import quote
 
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-
 from .models import (
     Actor, User, Subscription, Profile, PaymentHistory,
     Title, Season, Episode, TVShowExtras
@@ -38,8 +35,11 @@ from .serializers import (
     ProfileSerializer, PaymentHistorySerializer, TitleSerializer,
     EpisodeSerializer, SeasonSerializer, TVExtrasSerializer, TitleListSerializer
 )
+from .tasks import send_templated_email, seed_profile_snapshot_task
+from .pagination import CachedCountPagination, CachedCountResultsSetPagination
 
 signer = TimestampSigner()
+EMAIL_CHANGE_MAX_AGE = 60 * 60 * 24  # 24h validity
 
 
 from rest_framework.permissions import AllowAny
@@ -50,10 +50,18 @@ from rest_framework_simplejwt.views import (
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 
+_RX_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
 def norm_name(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
+    # chaque run non alphanumérique (espaces compris) devient UN espace: pas besoin d'un 2e \s+
+    return _RX_NON_ALNUM.sub(" ", (s or "").lower()).strip()
+
+
+@lru_cache(maxsize=256)
+def _genre_rx(genre: str):
+    # match: début OU ", " + genre, puis fin OU ","; compilée une fois par genre
+    return re.compile(rf"(^|,\s*){re.escape(genre)}(\s*,|$)", re.IGNORECASE)
 
 
 # Optional: customize token payload (keep or remove as you like)
@@ -79,12 +87,27 @@ class TokenRefreshView(_BaseTokenRefreshView):
 
 # ------------------ Permissions ------------------
 
+def _memo_on_request(request, key, check):
+    """
+    DRF may evaluate the same permission more than once per request (composed
+    OR/AND permissions, get_object + explicit check_object_permissions):
+    keep the first answer on the request.
+    """
+    memo = request.__dict__.setdefault("_perm_cache", {})
+    if key not in memo:
+        memo[key] = check()
+    return memo[key]
+
+
 class IsAdminOrReadOnly(BasePermission):
     """Anyone can read; only staff can write."""
     def has_permission(self, request, view):
         if request.method in SAFE_METHODS:
             return True
-        return bool(request.user and request.user.is_staff)
+        return _memo_on_request(
+            request, ("admin", getattr(view, "action", None)),
+            lambda: bool(request.user and request.user.is_staff),
+        )
 
 
 class IsSelfOrAdmin(BasePermission):
@@ -92,15 +115,26 @@ class IsSelfOrAdmin(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
-        if request.user and request.user.is_staff:
-            return True
-        return obj == request.user
+
+        def check():
+            if request.user and request.user.is_staff:
+                return True
+            return obj == request.user
+
+        return _memo_on_request(request, ("self", type(obj), obj.pk), check)
 
 
 # ------------------ Users ------------------
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    # UserSerializer.get_subscription picks from this list instead of querying per user
+    queryset = User.objects.prefetch_related(
+        Prefetch(
+            'subscription_set',
+            queryset=Subscription.objects.order_by('-start_date', '-id'),
+            to_attr='prefetched_subscriptions',
+        )
+    )
     serializer_class = UserSerializer
     lookup_field = 'id'
     permission_classes = [IsAuthenticated, IsSelfOrAdmin]
@@ -108,7 +142,8 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'], permission_classes=[AllowAny], url_path='register')
     def register(self, request):
         data = request.data.copy()
-        email = data.get('email')
+        email = (data.get('email') or '').strip().lower()
+        data['email'] = email
         password = data.get('password')
 
         if not email:
@@ -140,25 +175,25 @@ class UserViewSet(viewsets.ModelViewSet):
         plan_type = (request.data.get('plan_type') or 'Premium').capitalize()  # 'Premium' or 'Basic'
         plan_id = request.data.get('plan_id') or plan_type
 
-        # Optional policy: prevent duplicate active for same type
-        if Subscription.objects.filter(user=user, plan_type=plan_type, status="Active").exists():
-            return Response({'error': f'You already have an active {plan_type} subscription.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-
         # Create subscription
         start = timezone.now()
         renewal = None if plan_type == 'Basic' else start + timedelta(days=30)
 
-        sub = Subscription.objects.create(
-            user=user,
-            plan_id=plan_id,
-            plan_type=plan_type,
-            start_date=start,
-            renewal_date=renewal,
-            status="Active",
-            is_trial=False,
-            
-        )
+        # One Active sub per plan type is enforced by uniq_active_sub_per_type (no racy pre-check)
+        try:
+            with transaction.atomic():
+                sub = Subscription.objects.create(
+                    user=user,
+                    plan_id=plan_id,
+                    plan_type=plan_type,
+                    start_date=start,
+                    renewal_date=renewal,
+                    status="Active",
+                    is_trial=False,
+                )
+        except IntegrityError:
+            return Response({'error': f'You already have an active {plan_type} subscription.'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         # Optionally log a local (fake) payment for Premium
         if plan_type == 'Premium':
@@ -181,20 +216,31 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], permission_classes=[AllowAny], url_path='login')
     def login(self, request):
-        email = request.data.get('email')
+        email = (request.data.get('email') or '').strip().lower()
         password = request.data.get('password')
 
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        # filter().first(): no LIMIT 21 MultipleObjectsReturned probe
+        user = User.objects.filter(email=email).first()
+        if user is None:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
         if not check_password(password, user.password):
             return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Blacklist existing refresh tokens
-        for t in OutstandingToken.objects.filter(user=user):
-            BlacklistedToken.objects.get_or_create(token=t)
+        # Expired refresh tokens are rejected anyway: drop them (and their
+        # blacklist rows) so the per-user set stays small.
+        OutstandingToken.objects.filter(user=user, expires_at__lt=timezone.now()).delete()
+
+        # Blacklist existing refresh tokens: 3 queries whatever the token count
+        outstanding = list(OutstandingToken.objects.filter(user=user).values_list("id", flat=True))
+        already = set(
+            BlacklistedToken.objects.filter(token_id__in=outstanding).values_list("token_id", flat=True)
+        )
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=tid) for tid in outstanding if tid not in already],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
 
         refresh = RefreshToken.for_user(user)
 
@@ -216,7 +262,7 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated], url_path='request-email-change')
     def request_email_change(self, request, id=None):
         user = self.get_object()
-        new_email = request.data.get("new_email")
+        new_email = (request.data.get("new_email") or "").strip().lower()
 
         if not new_email:
             return Response({"error": "New email is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -226,7 +272,9 @@ class UserViewSet(viewsets.ModelViewSet):
 
         # Generate a signed token link
        
-        raw_token = signer.sign(new_email)
+        # lié au compte ET à l'email actuel: une fois le changement fait, le lien ne matche
+        # plus user.email (état en DB, donc vu par tous les workers) -> pas de rejeu
+        raw_token = signer.sign_object({"uid": str(user.id), "from": user.email, "to": new_email})
         token = quote(raw_token, safe="")
         confirm_url = f"{settings.FRONTEND_URL}/confirm-email-change/{user.id}/{token}"
 
@@ -238,19 +286,7 @@ class UserViewSet(viewsets.ModelViewSet):
             "support_email": "support@yourdomain.com",
             "company_name": "Taurus",  # <- customize
         }
-        subject = "Confirm your new email address"
-
-        html_message = render_to_string("emails/email_change.html", context)
-        plain_message = strip_tags(html_message)
-
-        send_mail(
-            subject,
-            plain_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [new_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        send_templated_email("Confirm your new email address", [new_email], "emails/email_change.html", context)
 
         return Response({"message": "Confirmation email sent"}, status=status.HTTP_200_OK)
 
@@ -266,12 +302,24 @@ class UserViewSet(viewsets.ModelViewSet):
         if not token:
             return Response({"error": "Token is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            new_email = signer.unsign(token, max_age=60*60*24)  # 24h validity
-        except SignatureExpired:
-            return Response({"error": "Token expired"}, status=status.HTTP_400_BAD_REQUEST)
-        except BadSignature:
+        # re-clics / refresh: le HMAC n'est refait qu'une fois par minute pour un même token
+        # (simple mémo; la validité est toujours jugée contre la DB ci-dessous)
+        token_key = hashlib.sha256(token.encode()).hexdigest()[:32]
+        claims = cache.get(f"ec:ok:{token_key}")
+        if claims is None:
+            try:
+                claims = signer.unsign_object(token, max_age=EMAIL_CHANGE_MAX_AGE)
+            except SignatureExpired:
+                return Response({"error": "Token expired"}, status=status.HTTP_400_BAD_REQUEST)
+            except (BadSignature, ValueError):  # ValueError: ancien format (email seul)
+                return Response({"error": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
+            cache.set(f"ec:ok:{token_key}", claims, 60)
+
+        if not isinstance(claims, dict) or claims.get("uid") != str(user.id):
             return Response({"error": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
+        if claims.get("from") != user.email:
+            return Response({"error": "Token already used"}, status=status.HTTP_400_BAD_REQUEST)
+        new_email = claims["to"]
 
         # prevent collisions
         if User.objects.filter(email=new_email).exclude(id=user.id).exists():
@@ -279,6 +327,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
         user.email = new_email
         user.save(update_fields=["email"])
+        cache.delete(f"ec:ok:{token_key}")
         return Response({"message": "Email updated successfully"}, status=status.HTTP_200_OK)    
 
 
@@ -289,7 +338,8 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
     queryset = Subscription.objects.all()
 
     def get_queryset(self):
-        qs = super().get_queryset().filter(user_id=self.kwargs['user_id'])
+        # user joint: cancel renvoie UserSerializer(sub.user)
+        qs = super().get_queryset().select_related('user').filter(user_id=self.kwargs['user_id'])
         return qs.order_by(
             models.Case(models.When(status='Active', then=0), default=1, output_field=models.IntegerField()),
             '-start_date'
@@ -304,18 +354,20 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         start = timezone.now()
         renewal = None if plan_type == 'Basic' else start + timedelta(days=30)
 
-        # Optional: remove previous subs to ensure single active
-        Subscription.objects.filter(user_id=user_id).delete()
-
-        sub = Subscription.objects.create(
-            user_id=user_id,
-            plan_id=request.data.get('plan_id') or plan_type,
-            plan_type=plan_type,
-            start_date=start,
-            renewal_date=renewal,
-            status="Active",
-            is_trial=False,
-        )
+        # Single active: the previous ones are canceled (one UPDATE, history kept), not deleted
+        with transaction.atomic():
+            Subscription.objects.filter(user_id=user_id, status="Active").update(
+                status="Canceled", renewal_date=start,
+            )
+            sub = Subscription.objects.create(
+                user_id=user_id,
+                plan_id=request.data.get('plan_id') or plan_type,
+                plan_type=plan_type,
+                start_date=start,
+                renewal_date=renewal,
+                status="Active",
+                is_trial=False,
+            )
         return Response(SubscriptionSerializer(sub).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['put'], url_path='cancel')
@@ -325,8 +377,13 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             return Response({"error": "Subscription already canceled"}, status=400)
         sub.status = 'Canceled'
         sub.renewal_date = timezone.now()
-        sub.save()
-        return Response(UserSerializer(sub.user, context={'request': request}).data, status=status.HTTP_200_OK)
+        sub.save(update_fields=['status', 'renewal_date'])
+        user = sub.user
+        # une lecture (après le save) au lieu des deux de get_subscription
+        user.prefetched_subscriptions = list(
+            Subscription.objects.filter(user_id=user.pk).order_by('-start_date', '-id')
+        )
+        return Response(UserSerializer(user, context={'request': request}).data, status=status.HTTP_200_OK)
 
 
 # ------------------ Profiles & Payments history ------------------
@@ -337,20 +394,15 @@ class ProfileViewSet(viewsets.ModelViewSet):
     serializer_class = ProfileSerializer
 
     def get_queryset(self):
-        return Profile.objects.filter(user__id=self.kwargs.get('user_id'))
+        return Profile.objects.filter(user_id=self.kwargs.get('user_id'))
 
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
 
         profile_id = response.data.get("id")
         if profile_id:
-            try:
-                from reco.views import upsert_seed_snapshot  # ou reco.seed, mais il faut que ça match ton vrai fichier
-                p = Profile.objects.get(id=profile_id)
-                upsert_seed_snapshot(p, hours=24*365*10)
-                logger.info("[seed] snapshot created for profile_id=%s", profile_id)
-            except Exception as e:
-                logger.exception("[seed] FAILED for profile_id=%s error=%s", profile_id, e)
+            # snapshot construit hors requête, une fois le profil commité
+            transaction.on_commit(lambda: seed_profile_snapshot_task(profile_id))
 
         return response
 
@@ -359,7 +411,7 @@ class PaymentHistoryViewSet(viewsets.ModelViewSet):
     serializer_class = PaymentHistorySerializer
 
     def get_queryset(self):
-        return PaymentHistory.objects.filter(user__id=self.kwargs.get('user_id'))
+        return PaymentHistory.objects.filter(user_id=self.kwargs.get('user_id'))
 
 
 # ------------------ Auth utils ------------------
@@ -380,13 +432,12 @@ class LogoutView(APIView):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def request_password_reset(request):
-    email = request.data.get('email')
+    email = (request.data.get('email') or '').strip().lower()
     if not email:
         return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        user = User.objects.get(email=email)
-    except User.DoesNotExist:
+    user = User.objects.filter(email=email).first()
+    if user is None:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
     token = default_token_generator.make_token(user)
@@ -401,18 +452,7 @@ def request_password_reset(request):
         "company_name": "Taurus",  # change to your branding
     }
 
-    subject = "Reset your password"
-    html_message = render_to_string("emails/password_reset.html", context)
-    plain_message = strip_tags(html_message)
-
-    send_mail(
-        subject,
-        plain_message,
-        settings.DEFAULT_FROM_EMAIL,
-        [email],
-        html_message=html_message,
-        fail_silently=False,
-    )
+    send_templated_email("Reset your password", [email], "emails/password_reset.html", context)
     return Response({'message': 'Password reset link sent'}, status=status.HTTP_200_OK)
 
 
@@ -442,20 +482,28 @@ def confirm_password_reset(request):
 
 # ------------------ Movies/TV content ------------------
 
+# Exactly the columns TitleListSerializer reads: no heavy JSONFields hydrated,
+# and no deferred-field reload (1 query per row per missing field) during serialization.
+TITLE_LIST_ONLY = TitleListSerializer.Meta.fields
+
+
+def title_detail_queryset():
+    # TitleSerializer nests tv_extras, seasons -> episodes and actors:
+    # 1 JOIN + 3 prefetch queries per request instead of 3+ queries per title.
+    return Title.objects.select_related("tv_extras").prefetch_related("seasons__episodes", "actors")
+
 class MovieList(APIView):
     serializer_class = TitleSerializer
     permission_classes = [IsAdminOrReadOnly]
 
     def get(self, request):
-        qs = Title.objects.filter(type="movie").only(
-            "id","type","title","poster","landscape_image",
-            "release_year","vote_average","popularity"
-        ).order_by("-popularity","-vote_average","-id")
+        # values(): TitleListSerializer ne fait que recopier ces colonnes, pas besoin d'instances
+        qs = Title.objects.filter(type="movie").values(*TITLE_LIST_ONLY).order_by("-popularity","-vote_average","-id")
 
-        paginator = PageNumberPagination()
+        paginator = CachedCountPagination()
         paginator.page_size = int(request.query_params.get("page_size", 40))
         page = paginator.paginate_queryset(qs, request)
-        return paginator.get_paginated_response(TitleListSerializer(page, many=True).data)
+        return paginator.get_paginated_response(page)
 
     def post(self, request):
         data = request.data.copy()
@@ -472,7 +520,7 @@ class MovieDetail(APIView):
 
     def get(self, request, pk):
         try:
-            movie = Title.objects.get(pk=pk, type="movie")
+            movie = title_detail_queryset().get(pk=pk, type="movie")
         except Title.DoesNotExist:
             return Response({"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
         return Response(TitleSerializer(movie).data)
@@ -498,17 +546,14 @@ class MovieDetail(APIView):
 
 class TitleViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = CachedCountResultsSetPagination
 
     def get_queryset(self):
-        qs = Title.objects.only(
-            "id",
-            "type",
-            "title",
-            "poster",
-            "release_year",
-            "vote_average",
-            "popularity"
-        )
+        if self.action in ("retrieve", "update", "partial_update"):
+            # full TitleSerializer: every column + nested relations, no deferred-field reloads
+            qs = title_detail_queryset()
+        else:
+            qs = Title.objects.only(*TITLE_LIST_ONLY)
 
         params = self.request.query_params
 
@@ -529,9 +574,15 @@ class TitleViewSet(viewsets.ModelViewSet):
         # genre (texte CSV)
         genre = (params.get("genre") or "").strip()
         if genre:
-            g = re.escape(genre.strip())
-            # match: début OU ", " + genre, puis fin OU ","
-            qs = qs.filter(genre__iregex=rf"(^|,\s*){g}(\s*,|$)")
+            rx = _genre_rx(genre)
+            # La regex tourne sur les combinaisons distinctes (lues sur l'index genre),
+            # pas sur chaque ligne; le filtre devient un IN indexé.
+            matching = [
+                v for v in Title.objects.order_by().values_list("genre", flat=True).distinct()
+                if v and rx.search(v)
+            ]
+            # aucun genre connu: none() plutôt qu'un IN () vide
+            qs = qs.filter(genre__in=matching) if matching else qs.none()
 
         # director
         director = (params.get("director") or "").strip()
@@ -542,8 +593,10 @@ class TitleViewSet(viewsets.ModelViewSet):
         actor = (params.get("actor") or "").strip()
         if actor:
             a = norm_name(actor)
-            # performant (prefix) + utilise ton name_norm indexé
-            qs = qs.filter(actors__name_norm__istartswith=a).distinct()
+            # performant (prefix) + utilise ton name_norm indexé; IN (sous-requête) au lieu
+            # d'un JOIN + DISTINCT. istartswith gardé: sur MySQL c'est LIKE 'a%' (index),
+            # startswith deviendrait LIKE BINARY, que l'index *_ci ne sert pas.
+            qs = qs.filter(id__in=Actor.objects.filter(name_norm__istartswith=a).values("title_id"))
 
         # ratingMin (sur vote_average)
         rating_min = params.get("ratingMin")
@@ -574,7 +627,14 @@ class TitleViewSet(viewsets.ModelViewSet):
 
         return qs.order_by("-popularity", "-vote_average", "-id")
 
-        
+    def list(self, request, *args, **kwargs):
+        # TitleListSerializer ne fait que recopier ces colonnes: dicts values(), sans instances ni serializer
+        qs = self.filter_queryset(self.get_queryset()).values(*TITLE_LIST_ONLY)
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(qs))
+
     def get_serializer_class(self):
         if self.action == "list":
             return TitleListSerializer
@@ -585,7 +645,7 @@ class TitleViewSet(viewsets.ModelViewSet):
     @method_decorator(cache_page(60*60))
     def seasons(self, request, pk=None):
         title = self.get_object()
-        qs = title.seasons.all().order_by("season_number")
+        qs = title.seasons.prefetch_related("episodes").order_by("season_number")
         return Response(SeasonSerializer(qs, many=True, context=self.get_serializer_context()).data)
     @action(detail=False, methods=["get"])
     @method_decorator(cache_page(60*60))
@@ -597,8 +657,9 @@ class TitleViewSet(viewsets.ModelViewSet):
         if t in ("movie", "tv"):
             qs = qs.filter(type=t)
 
+        # DISTINCT côté DB: quelques centaines de combinaisons "A, B" au lieu d'une ligne par titre
         genres_set = set()
-        for g in qs.values_list("genre", flat=True):
+        for g in qs.order_by().values_list("genre", flat=True).distinct():
             if not g:
                 continue
             parts = [p.strip() for p in str(g).split(",") if p.strip()]
@@ -624,26 +685,46 @@ class TitleViewSet(viewsets.ModelViewSet):
         if not q:
             return Response([])
 
-        qs = Title.objects.all()
+        base = Title.objects.all()
 
         if t in ("movie", "tv"):
-            qs = qs.filter(type=t)
+            base = base.filter(type=t)
+
+        # UNION de deux top-N (un range scan par index title / original_title)
+        # plutôt qu'un OR que MySQL résout souvent par un scan complet
+        order = ("-popularity", "-vote_average", "-id")
 
-        qs = qs.filter(
-            Q(title__istartswith=q) |
-            Q(original_title__istartswith=q)
-        ).order_by("-popularity", "-vote_average", "-id")[:limit]
+        def top(field):
+            return (
+                base.filter(**{f"{field}__istartswith": q})
+                .order_by(*order)
+                .values("id", "popularity", "vote_average")[:limit]
+            )
 
-        # serializer liste léger (inclut trailer_url si tu l’as ajouté)
-        data = TitleListSerializer(qs, many=True, context=self.get_serializer_context()).data
-        return Response(data)
+        if connection.features.supports_slicing_ordering_in_compound:
+            rows = top("title").union(top("original_title")).order_by(*order)[:limit]
+        else:
+            # SQLite & co: pas de LIMIT dans une branche de UNION -> 2 requêtes, fusion en Python
+            # (même ordre que le SQL: DESC, NULL en dernier, id en départage)
+            merged = {r["id"]: r for r in [*top("title"), *top("original_title")]}
+
+            def desc_key(r):
+                p, v = r["popularity"], r["vote_average"]
+                return (p is not None, p or 0, v is not None, v or 0, r["id"])
+
+            rows = sorted(merged.values(), key=desc_key, reverse=True)[:limit]
+        ids = [r["id"] for r in rows]
+        # mêmes colonnes que TitleListSerializer, directement en dicts
+        by_id = {r["id"]: r for r in Title.objects.filter(id__in=ids).values(*TITLE_LIST_ONLY)}
+        return Response([by_id[i] for i in ids if i in by_id])
     
 class SeasonViewSet(viewsets.ModelViewSet):
     serializer_class = SeasonSerializer
     permission_classes = [IsAdminOrReadOnly]
 
     def get_queryset(self):
-        qs = Season.objects.select_related("tv")
+        # SeasonSerializer nests episodes (one prefetch query, not one per season); tv isn't serialized
+        qs = Season.objects.prefetch_related("episodes")
         title_id = self.kwargs.get("title_pk")
         if title_id:
             qs = qs.filter(tv_id=title_id)
@@ -665,7 +746,8 @@ class EpisodeViewSet(viewsets.ModelViewSet):
     serializer_class = EpisodeSerializer
 
     def get_queryset(self):
-        qs = Episode.objects.select_related('season', 'season__tv')
+        # EpisodeSerializer has no season/tv field: no JOIN needed
+        qs = Episode.objects.all()
         season_id = self.kwargs.get('season_pk')  # from nested router
         title_id = self.kwargs.get('title_pk')    # parent nested lookup
 
@@ -687,7 +769,7 @@ class TVShowExtrasViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
 
     def get_queryset(self):
-        qs = TVShowExtras.objects.select_related("title")
+        qs = TVShowExtras.objects.all()
         title_id = self.request.query_params.get("title")
         if title_id:
             qs = qs.filter(title_id=title_id)
@@ -711,18 +793,15 @@ def titles_by_actor(request):
         return Response({"detail": "tmdb_id must be an integer"}, status=400)
 
     # titles linked to this actor (your schema is Actor(title_id, tmdb_id, ...))
-    title_ids = (
-        Actor.objects
-        .filter(tmdb_id=tmdb_id_int)
-        .values_list("title_id", flat=True)
-        .distinct()
-    )
+    # IN (subquery) -> semi-join MySQL: une seule requête, dédoublonnée sans DISTINCT
+    title_ids = Actor.objects.filter(tmdb_id=tmdb_id_int).values("title_id")
 
     # Fetch titles and return as list cards
     qs = (
         Title.objects
         .filter(id__in=title_ids)
+        .values(*TITLE_LIST_ONLY)
         .order_by("-popularity", "-vote_average", "-id")
     )
 
-    return Response({"results": TitleListSerializer(qs, many=True).data})
\ No newline at end of file
+    return Response({"results": list(qs)})
\ No newline at end of file